@@ -9,30 +9,18 @@ Usage:
 Requires:
     - picamera2
     - pigpio daemon running (sudo systemctl start pigpiod)
+    - motorlib.py copied alongside this script
     - OpenCV (cv2)
 """
 
 import cv2
 import numpy as np
-import pigpio
 import time
 import signal
 import sys
 import os
 import argparse
-
-# GPIO pin assignments (same as motor_test.py)
-LEFT_MOTOR = 18   # Pin 12
-RIGHT_MOTOR = 13  # Pin 33
-
-# Motor direction (set to True if motor runs backward)
-LEFT_INVERTED = True
-RIGHT_INVERTED = True
-
-# PWM values (microseconds)
-NEUTRAL = 1500
-DRIVE_SPEED = 110  # Forward speed
-FORWARD_TRIM = 1.8  # Positive = boost right motor (corrects drift)
+from motorlib import MotorController
 
 # Color tracking settings (red in HSV)
 RED_LOWER1 = np.array([0, 120, 70])
@@ -51,58 +39,6 @@ LOST_TIMEOUT = 0.5  # Seconds to keep driving after losing red
 DEBUG_DIR = "/tmp/follow_red_debug"
 
 
-class MotorController:
-    def __init__(self):
-        self.pi = pigpio.pi()
-        if not self.pi.connected:
-            raise RuntimeError("Could not connect to pigpio daemon. Run: sudo systemctl start pigpiod")
-        self.stop()
-        print("Motors initialized")
-
-    def _apply_inversion(self, left_us, right_us):
-        """Apply motor inversion."""
-        if LEFT_INVERTED:
-            left_us = 3000 - left_us
-        if RIGHT_INVERTED:
-            right_us = 3000 - right_us
-        return left_us, right_us
-
-    def set_motors(self, left_us, right_us):
-        """Set motor speeds in microseconds (1000-2000)."""
-        left_us, right_us = self._apply_inversion(left_us, right_us)
-        self.pi.set_servo_pulsewidth(LEFT_MOTOR, left_us)
-        self.pi.set_servo_pulsewidth(RIGHT_MOTOR, right_us)
-
-    def stop(self):
-        """Stop both motors."""
-        self.set_motors(NEUTRAL, NEUTRAL)
-
-    def drive(self, steer=0.0, speed=DRIVE_SPEED):
-        """Drive forward with steering.
-        steer: -1.0 (full left) to 1.0 (full right), 0.0 = straight.
-        Reduces inner motor speed to curve; outer stays at full speed.
-        """
-        left_speed = speed
-        right_speed = speed
-        if steer < 0:
-            # Curve left: slow down left motor
-            left_speed = speed * (1.0 + steer)  # steer is negative, so this reduces
-        elif steer > 0:
-            # Curve right: slow down right motor
-            right_speed = speed * (1.0 - steer)
-        left_us = NEUTRAL + left_speed - FORWARD_TRIM
-        right_us = NEUTRAL + right_speed + FORWARD_TRIM
-        self.set_motors(round(left_us), round(right_us))
-
-    def cleanup(self):
-        """Stop motors and release GPIO."""
-        self.stop()
-        time.sleep(0.1)
-        self.pi.set_servo_pulsewidth(LEFT_MOTOR, 0)
-        self.pi.set_servo_pulsewidth(RIGHT_MOTOR, 0)
-        self.pi.stop()
-
-
 def detect_red(frame):
     """
     Detect red blobs in frame.
@@ -204,6 +140,7 @@ def main():
     if not args.no_motors:
         try:
             motors = MotorController()
+            print("Motors initialized")
         except RuntimeError as e:
             print(f"Error: {e}")
             camera.stop()
@@ -60,9 +60,21 @@ GESTURE_NAMES = [
 ]
 
 
+# The helpers below index landmarks as (x, y, z) rows. Each public one accepts
+# rows or Landmark / MediaPipe landmark objects, converting objects via as_rows()
+X, Y, Z = 0, 1, 2
+
+
+def as_rows(landmarks):
+    """Return landmarks as (x, y, z) rows; rows (or an (N, 3) array) pass through unchanged."""
+    if len(landmarks) and hasattr(landmarks[0], 'x'):
+        return [(lm.x, lm.y, lm.z) for lm in landmarks]
+    return landmarks
+
+
 def _distance(lm1, lm2) -> float:
     """Calculate 2D distance between two landmarks."""
-    return ((lm1.x - lm2.x)**2 + (lm1.y - lm2.y)**2)**0.5
+    return ((lm1[X] - lm2[X])**2 + (lm1[Y] - lm2[Y])**2)**0.5
 
 
 def get_straightness_ratio(landmarks, mcp: int, pip: int, dip: int, tip: int) -> float:
@@ -71,6 +83,7 @@ def get_straightness_ratio(landmarks, mcp: int, pip: int, dip: int, tip: int) ->
     Compares direct MCP→TIP distance to sum of joint segments.
     Returns 1.0 for perfectly straight, lower values for bent fingers.
     """
+    landmarks = as_rows(landmarks)
     direct = _distance(landmarks[mcp], landmarks[tip])
     segments = (
         _distance(landmarks[mcp], landmarks[pip]) +
@@ -88,6 +101,7 @@ def is_finger_straight(landmarks, mcp: int, pip: int, dip: int, tip: int) -> boo
     This is direction-agnostic: works for pointing up, down, forward, etc.
     A straight finger has ratio close to 1.0, a bent finger has lower ratio.
     """
+    landmarks = as_rows(landmarks)
     # Direct distance from MCP to TIP
     direct = _distance(landmarks[mcp], landmarks[tip])
 
@@ -111,6 +125,7 @@ def get_finger_extension(landmarks, tip_idx: int) -> Tuple[bool, float]:
     Returns (is_extended, confidence) where confidence is 0-1.
     Higher confidence means the finger state is clearly extended or clearly curled.
     """
+    landmarks = as_rows(landmarks)
     STRAIGHT_THRESH = 0.9
     CURLED_THRESH = 0.75
 
@@ -156,6 +171,7 @@ def is_finger_extended(landmarks, tip_idx: int, mcp_idx: int) -> bool:
     Uses joint alignment to detect extension regardless of pointing direction.
     Falls back to y-position check for additional robustness.
     """
+    landmarks = as_rows(landmarks)
     # Map tip index to finger name
     finger_map = {
         INDEX_TIP: 'index',
@@ -170,7 +186,7 @@ def is_finger_extended(landmarks, tip_idx: int, mcp_idx: int) -> bool:
         return is_finger_straight(landmarks, mcp, pip, dip, tip)
 
     # Fallback to original y-position check
-    diff = landmarks[mcp_idx].y - landmarks[tip_idx].y
+    diff = landmarks[mcp_idx][Y] - landmarks[tip_idx][Y]
     return diff > 0.03
 
 
@@ -179,12 +195,13 @@ def get_thumb_extension(landmarks) -> Tuple[bool, float]:
 
     Returns (is_extended, confidence) where confidence is 0-1.
     """
+    landmarks = as_rows(landmarks)
     thumb_tip = landmarks[THUMB_TIP]
     index_mcp = landmarks[INDEX_MCP]
 
     # Vertical distance: positive means thumb is above index MCP
-    vert_dist = index_mcp.y - thumb_tip.y
-    horiz_dist = abs(thumb_tip.x - index_mcp.x)
+    vert_dist = index_mcp[Y] - thumb_tip[Y]
+    horiz_dist = abs(thumb_tip[X] - index_mcp[X])
 
     # Horizontal extension threshold
     HORIZ_THRESH = 0.1
@@ -245,6 +262,7 @@ MAX_AVG_RATIO_FIST = 0.70         # Average finger ratio for fist
 
 def get_all_finger_ratios(landmarks) -> Dict[str, float]:
     """Get straightness ratios for all four fingers."""
+    landmarks = as_rows(landmarks)
     return {
         'index': get_straightness_ratio(landmarks, *FINGER_JOINTS['index']),
         'middle': get_straightness_ratio(landmarks, *FINGER_JOINTS['middle']),
@@ -259,6 +277,7 @@ def get_finger_spread(landmarks) -> float:
     Higher values indicate fingers are spread apart (deliberate gesture).
     Lower values indicate fingers are close together (relaxed hand).
     """
+    landmarks = as_rows(landmarks)
     tips = [INDEX_TIP, MIDDLE_TIP, RING_TIP, PINKY_TIP]
     total = 0
     for i in range(len(tips) - 1):
@@ -272,8 +291,9 @@ def get_fingertip_z_spread(landmarks) -> float:
     Low values indicate palm facing camera (all fingertips at similar depth).
     High values indicate side view (fingertips at varying depths).
     """
+    landmarks = as_rows(landmarks)
     tips = [THUMB_TIP, INDEX_TIP, MIDDLE_TIP, RING_TIP, PINKY_TIP]
-    z_coords = [landmarks[t].z for t in tips]
+    z_coords = [landmarks[t][Z] for t in tips]
     return max(z_coords) - min(z_coords)
 
 
@@ -284,7 +304,8 @@ def detect_hand_gesture(landmarks, handedness: str,
     Analyze hand landmarks and return detected gesture.
 
     Args:
-        landmarks: List of 21 Landmark objects (or MediaPipe landmarks)
+        landmarks: 21 (x, y, z) rows (e.g. an (N, 3) array's .tolist()),
+                   or Landmark / MediaPipe landmark objects
         handedness: "Left" or "Right"
         confidence_threshold: Minimum confidence to return a gesture (0-1).
                              Below this, returns "UNKNOWN".
@@ -294,6 +315,7 @@ def detect_hand_gesture(landmarks, handedness: str,
     """
     if not landmarks or len(landmarks) < 21:
         return "NO HAND", (128, 128, 128)
+    landmarks = as_rows(landmarks)
 
     # Get finger states with confidence
     thumb_up, thumb_conf = get_thumb_extension(landmarks)
@@ -326,8 +348,8 @@ def detect_hand_gesture(landmarks, handedness: str,
         # THUMBS UP requires thumb to be vertically extended (pointing up), not just sideways
         thumb_tip = landmarks[THUMB_TIP]
         index_mcp = landmarks[INDEX_MCP]
-        vert_dist = index_mcp.y - thumb_tip.y
-        horiz_dist = abs(thumb_tip.x - index_mcp.x)
+        vert_dist = index_mcp[Y] - thumb_tip[Y]
+        horiz_dist = abs(thumb_tip[X] - index_mcp[X])
         # Strong vertical OR moderate vertical with thumb pointing toward camera (low horiz)
         is_thumbs_up = (vert_dist > 0.08 or
                        (vert_dist > 0.045 and horiz_dist < 0.04))
@@ -390,10 +412,15 @@ def landmarks_to_dict(landmarks) -> List[Dict[str, float]]:
     """
     Convert list of landmarks to serializable dict format.
 
-    Works with both MediaPipe NormalizedLandmark objects and our Landmark dataclass.
+    Works with MediaPipe NormalizedLandmark objects, our Landmark dataclass,
+    and plain (x, y, z) rows such as an (N, 3) NumPy array.
     """
     result = []
     for lm in landmarks:
+        if not hasattr(lm, 'x'):
+            # (x, y, z) row
+            result.append({'x': float(lm[0]), 'y': float(lm[1]), 'z': float(lm[2])})
+            continue
         entry = {
             'x': float(lm.x),
             'y': float(lm.y),
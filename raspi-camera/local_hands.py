@@ -22,22 +22,35 @@ import time
 import urllib.request
 import os
 import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice
 import video_source
 from gesture_hands import (
     detect_hand_gesture, landmarks_to_dict, GESTURE_NAMES
 )
 
+# Optional: faster JSON encoding for captured test cases
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Model path
 MODEL_PATH = "hand_landmarker.task"
 MODEL_URL = "https://storage.googleapis.com/mediapipe-models/hand_landmarker/hand_landmarker/float16/latest/hand_landmarker.task"
 
-# Gesture log
-gesture_log = []
+# Gesture log (oldest entries drop off automatically)
+gesture_log = deque(maxlen=10)
 last_logged_gesture = None
 last_log_time = 0
 gesture_flash_until = 0
 MIN_LOG_INTERVAL = 2.0
 
+# Side panel width (pixels)
+PANEL_WIDTH = 280
+
 # Capture mode state
 capture_selected_gesture = None
 capture_count = 0
@@ -65,8 +78,6 @@ def log_gesture(gesture):
     if gesture != last_logged_gesture:
         timestamp = time.strftime("%H:%M:%S")
         gesture_log.append((timestamp, gesture))
-        if len(gesture_log) > 10:
-            gesture_log.pop(0)
         last_logged_gesture = gesture
         last_log_time = now
         gesture_flash_until = now + 0.5
@@ -76,8 +87,8 @@ def log_gesture(gesture):
     return False
 
 
-def save_test_case(landmarks, handedness, frame, expected_gesture):
-    """Save a test case for evaluation."""
+def save_test_case(points, handedness, frame, expected_gesture):
+    """Save a test case for evaluation (points: (21, 3) landmark array)."""
     global capture_count
 
     # Create test data directory if needed
@@ -99,21 +110,37 @@ def save_test_case(landmarks, handedness, frame, expected_gesture):
         "id": case_id,
         "expected_gesture": expected_gesture,
         "handedness": handedness,
-        "landmarks": landmarks_to_dict(landmarks),
+        "landmarks": landmarks_to_dict(points),
         "captured_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
     }
     case_path = os.path.join(case_dir, "case.json")
-    with open(case_path, 'w') as f:
-        json.dump(case_data, f, indent=2)
+    if orjson is not None:
+        with open(case_path, 'wb') as f:
+            f.write(orjson.dumps(case_data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(case_path, 'w') as f:
+            json.dump(case_data, f, indent=2)
 
     capture_count += 1
     print(f"Saved test case: {case_id}")
     return case_id
 
 
-def draw_hand_landmarks(frame, landmarks, handedness):
-    """Draw hand landmarks and connections on frame."""
-    if not landmarks:
+def landmarks_to_array(landmarks):
+    """Copy MediaPipe landmarks into an (N, 3) array of normalized x, y, z.
+
+    Each MediaPipe attribute read crosses into C++, so do it once per hand
+    and pass the array to the drawing, gesture and capture code.
+    """
+    return np.array([(lm.x, lm.y, lm.z) for lm in landmarks], dtype=np.float32)
+
+
+def draw_hand_landmarks(frame, points, handedness):
+    """Draw hand landmarks and connections on frame.
+
+    points: (21, 3) array from landmarks_to_array().
+    """
+    if points is None or len(points) == 0:
         return frame
 
     h, w = frame.shape[:2]
@@ -131,37 +158,35 @@ def draw_hand_landmarks(frame, landmarks, handedness):
     # Color based on handedness
     color = (0, 255, 0) if handedness == "Right" else (255, 0, 0)
 
+    # Pixel coordinates for all landmarks at once
+    pixels = [tuple(p) for p in (points[:, :2] * (w, h)).astype(np.int32).tolist()]
+
     # Draw connections
     for start_idx, end_idx in connections:
-        start = landmarks[start_idx]
-        end = landmarks[end_idx]
-        pt1 = (int(start.x * w), int(start.y * h))
-        pt2 = (int(end.x * w), int(end.y * h))
-        cv2.line(frame, pt1, pt2, color, 2)
+        cv2.line(frame, pixels[start_idx], pixels[end_idx], color, 2)
 
     # Draw landmarks
-    for lm in landmarks:
-        cx, cy = int(lm.x * w), int(lm.y * h)
-        cv2.circle(frame, (cx, cy), 4, (255, 255, 255), -1)
+    for pt in pixels:
+        cv2.circle(frame, pt, 4, (255, 255, 255), -1)
 
     return frame
 
 
-def draw_pointing_line(frame, landmarks):
+def draw_pointing_line(frame, points):
     """Draw a line showing pointing direction when POINTING gesture detected."""
-    if not landmarks or len(landmarks) < 21:
+    if points is None or len(points) < 21:
         return frame
 
     h, w = frame.shape[:2]
 
     # Index finger landmarks: MCP(5) -> PIP(6) -> DIP(7) -> TIP(8)
     # Use PIP to TIP for direction (more stable than MCP to TIP)
-    pip = landmarks[6]  # Index PIP (middle joint)
-    tip = landmarks[8]  # Index TIP
+    pip_x, pip_y = points[6, :2].tolist()  # Index PIP (middle joint)
+    tip_x, tip_y = points[8, :2].tolist()  # Index TIP
 
     # Calculate direction vector
-    dx = tip.x - pip.x
-    dy = tip.y - pip.y
+    dx = tip_x - pip_x
+    dy = tip_y - pip_y
 
     # Normalize and extend the line
     length = (dx**2 + dy**2)**0.5
@@ -170,11 +195,11 @@ def draw_pointing_line(frame, landmarks):
 
     # Extend line by 2x frame width for visibility
     extend = 2.0 / length
-    end_x = tip.x + dx * extend
-    end_y = tip.y + dy * extend
+    end_x = tip_x + dx * extend
+    end_y = tip_y + dy * extend
 
     # Convert to pixel coordinates
-    pt1 = (int(tip.x * w), int(tip.y * h))
+    pt1 = (int(tip_x * w), int(tip_y * h))
     pt2 = (int(end_x * w), int(end_y * h))
 
     # Draw the pointing line (cyan, thin)
@@ -186,20 +211,105 @@ def draw_pointing_line(frame, landmarks):
     return frame
 
 
-def create_side_panel(gesture, gesture_color, fps, inference_ms, frame_height, is_flashing, num_hands, capture_mode=False):
-    """Create info panel showing gesture and stats."""
-    panel_width = 280
-    panel = np.zeros((frame_height, panel_width, 3), dtype=np.uint8)
+@lru_cache(maxsize=64)
+def _text_alpha(text, scale, thickness):
+    """Render text once as a coverage (alpha) map.
+
+    putText anti-aliases glyph edges, so the render is kept as 0-255 coverage
+    rather than thresholded. Returns (alpha, ascent, pad): alpha is uint16
+    (h, w, 1) covering the text plus a pad for the stroke; ascent is the text
+    height above the baseline.
+    """
+    (text_w, text_h), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+    pad = thickness + 2
+    canvas = np.zeros((text_h + baseline + 2 * pad, text_w + 2 * pad), dtype=np.uint8)
+    cv2.putText(canvas, text, (pad, text_h + pad),
+               cv2.FONT_HERSHEY_SIMPLEX, scale, 255, thickness)
+    return canvas.astype(np.uint16)[..., None], text_h, pad
+
+
+def draw_cached_text(img, text, org, scale, color, thickness):
+    """Draw text like cv2.putText (org = bottom-left) on a BGR image, reusing a cached render.
+
+    Blends color in by the cached 8-bit coverage, so anti-aliased edges are kept.
+    putText rounds its coverage differently, so a channel can be off by 1.
+    """
+    alpha, ascent, pad = _text_alpha(text, scale, thickness)
+    x0 = org[0] - pad
+    y0 = org[1] - ascent - pad
+    alpha_h, alpha_w = alpha.shape[:2]
+
+    # Clip to image bounds
+    img_h, img_w = img.shape[:2]
+    cx0, cy0 = max(x0, 0), max(y0, 0)
+    cx1, cy1 = min(x0 + alpha_w, img_w), min(y0 + alpha_h, img_h)
+    if cx0 >= cx1 or cy0 >= cy1:
+        return img
+
+    roi = img[cy0:cy1, cx0:cx1]
+    a = alpha[cy0 - y0:cy1 - y0, cx0 - x0:cx1 - x0]
+    roi[:] = (roi * (255 - a) + np.array(color, dtype=np.uint16) * a + 127) // 255
+    return img
+
+
+@lru_cache(maxsize=4)
+def _panel_template(frame_height, capture_mode):
+    """Side panel background with the static text (title, guide, controls) drawn once."""
+    panel = np.empty((frame_height, PANEL_WIDTH, 3), dtype=np.uint8)
     panel[:] = (30, 30, 30)
 
-    y_offset = 30
-
     # Title
     title = "CAPTURE MODE" if capture_mode else "Hand Detection"
     title_color = (0, 200, 255) if capture_mode else (255, 255, 255)
-    cv2.putText(panel, title, (10, y_offset),
+    cv2.putText(panel, title, (10, 30),
                cv2.FONT_HERSHEY_SIMPLEX, 0.7, title_color, 2)
-    y_offset += 30
+
+    # Gesture guide at bottom
+    y_offset = frame_height - 120
+    cv2.putText(panel, "Gestures:", (10, y_offset),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (150, 150, 150), 1)
+    y_offset += 20
+
+    gestures = [
+        "Fist = FIST",
+        "Thumb up = THUMBS UP",
+        "Point = POINTING",
+        "V sign = PEACE",
+        "Open hand = OPEN PALM",
+    ]
+    for text in gestures:
+        cv2.putText(panel, text, (10, y_offset),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, (120, 120, 120), 1)
+        y_offset += 16
+
+    y_offset += 5
+    if capture_mode:
+        cv2.putText(panel, "c-capture r-reconnect q-quit", (10, y_offset),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, (120, 120, 120), 1)
+    else:
+        cv2.putText(panel, "r-reconnect s-screenshot q-quit", (10, y_offset),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, (120, 120, 120), 1)
+
+    return panel
+
+
+def create_side_panel(gesture, gesture_color, fps, inference_ms, frame_height, is_flashing, num_hands,
+                      capture_mode=False, out=None):
+    """Create info panel showing gesture and stats.
+
+    If out is given (a frame_height x PANEL_WIDTH view), the panel is drawn
+    into it instead of a newly allocated array.
+    """
+    panel_width = PANEL_WIDTH
+    if out is None:
+        panel = np.empty((frame_height, panel_width, 3), dtype=np.uint8)
+    else:
+        panel = out
+
+    # Static background and text
+    np.copyto(panel, _panel_template(frame_height, capture_mode))
+
+    y_offset = 60
 
     cv2.putText(panel, f"Hands: {num_hands}", (10, y_offset),
                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (150, 150, 150), 1)
@@ -213,8 +323,7 @@ def create_side_panel(gesture, gesture_color, fps, inference_ms, frame_height, i
     else:
         text_color = gesture_color
 
-    cv2.putText(panel, gesture, (10, y_offset),
-               cv2.FONT_HERSHEY_SIMPLEX, 0.9, text_color, 2)
+    draw_cached_text(panel, gesture, (10, y_offset), 0.9, text_color, 2)
     y_offset += 45
 
     # Stats
@@ -259,38 +368,18 @@ def create_side_panel(gesture, gesture_color, fps, inference_ms, frame_height, i
                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (100, 255, 100), 1)
         y_offset += 22
 
-        for timestamp, logged_gesture in reversed(gesture_log[-6:]):
+        for timestamp, logged_gesture in islice(reversed(gesture_log), 6):
             cv2.putText(panel, f"{timestamp} {logged_gesture}", (10, y_offset),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.45, (180, 180, 180), 1)
             y_offset += 18
 
-    # Gesture guide at bottom
-    y_offset = frame_height - 120
-    cv2.putText(panel, "Gestures:", (10, y_offset),
-               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (150, 150, 150), 1)
-    y_offset += 20
-
-    gestures = [
-        "Fist = FIST",
-        "Thumb up = THUMBS UP",
-        "Point = POINTING",
-        "V sign = PEACE",
-        "Open hand = OPEN PALM",
-    ]
-    for text in gestures:
-        cv2.putText(panel, text, (10, y_offset),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, (120, 120, 120), 1)
-        y_offset += 16
+    return panel
 
-    y_offset += 5
-    if capture_mode:
-        cv2.putText(panel, "c-capture r-reconnect q-quit", (10, y_offset),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, (120, 120, 120), 1)
-    else:
-        cv2.putText(panel, "r-reconnect s-screenshot q-quit", (10, y_offset),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, (120, 120, 120), 1)
 
-    return panel
+def save_screenshot(filename, image):
+    """Write a screenshot (runs on the screenshot worker thread)."""
+    cv2.imwrite(filename, image)
+    print(f"Saved {filename}")
 
 
 def main():
@@ -343,18 +432,25 @@ def main():
     fps = 0
     inference_ms = 0
     frame_timestamp = 0
+    rgb_buf = None
+
+    # Frame + side panel canvas, reused across frames (reallocated if size changes)
+    display = None
+    screenshot_pool = ThreadPoolExecutor(max_workers=1)
 
     while True:
-        ret, frame = cap.read()
+        ret, frame = video_source.read_latest(cap)
         if not ret:
             print("Lost connection, reconnecting...")
             time.sleep(1)
             cap = video_source.reconnect(args, cap)
             continue
 
-        # Convert to RGB for MediaPipe
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=frame_rgb)
+        # Convert to RGB for MediaPipe into a reused buffer (mp.Image copies the data)
+        if rgb_buf is None or rgb_buf.shape != frame.shape:
+            rgb_buf = np.empty_like(frame)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb_buf)
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_buf)
 
         # Run hand detection
         inference_start = time.time()
@@ -366,24 +462,27 @@ def main():
         gesture = "NO HAND"
         gesture_color = (128, 128, 128)
         num_hands = len(results.hand_landmarks) if results.hand_landmarks else 0
-        current_landmarks = None
+        current_points = None
         current_handedness = "Unknown"
 
         if results.hand_landmarks:
+            # Read each hand's landmarks out of MediaPipe once
+            hand_points = [landmarks_to_array(hand) for hand in results.hand_landmarks]
+
             # Use the first detected hand
-            current_landmarks = results.hand_landmarks[0]
+            current_points = hand_points[0]
             current_handedness = results.handedness[0][0].category_name if results.handedness else "Unknown"
 
-            gesture, gesture_color = detect_hand_gesture(current_landmarks, current_handedness)
+            gesture, gesture_color = detect_hand_gesture(current_points.tolist(), current_handedness)
 
             # Draw all detected hands
-            for i, hand_landmarks in enumerate(results.hand_landmarks):
+            for i, points in enumerate(hand_points):
                 hand_name = results.handedness[i][0].category_name if results.handedness else "Unknown"
-                frame = draw_hand_landmarks(frame, hand_landmarks, hand_name)
+                frame = draw_hand_landmarks(frame, points, hand_name)
 
             # Draw pointing line if POINTING gesture detected
             if gesture == "POINTING":
-                frame = draw_pointing_line(frame, current_landmarks)
+                frame = draw_pointing_line(frame, current_points)
 
         # Log gesture
         log_gesture(gesture)
@@ -394,11 +493,9 @@ def main():
         # Draw gesture text on frame
         if is_flashing:
             cv2.rectangle(frame, (10, 15), (250, 60), gesture_color, -1)
-            cv2.putText(frame, gesture, (20, 50),
-                       cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 0), 2)
+            draw_cached_text(frame, gesture, (20, 50), 1.0, (0, 0, 0), 2)
         else:
-            cv2.putText(frame, gesture, (20, 50),
-                       cv2.FONT_HERSHEY_SIMPLEX, 1.0, gesture_color, 2)
+            draw_cached_text(frame, gesture, (20, 50), 1.0, gesture_color, 2)
 
         # Calculate FPS
         fps_count += 1
@@ -407,13 +504,14 @@ def main():
             fps_count = 0
             fps_time = time.time()
 
-        # Create side panel
-        panel = create_side_panel(gesture, gesture_color, fps, inference_ms,
-                                  frame.shape[0], is_flashing, num_hands,
-                                  capture_mode=args.capture)
-
-        # Concatenate horizontally
-        display = np.hstack([frame, panel])
+        # Compose frame and side panel into the reused display canvas
+        h, w = frame.shape[:2]
+        if display is None or display.shape[:2] != (h, w + PANEL_WIDTH):
+            display = np.empty((h, w + PANEL_WIDTH, 3), dtype=np.uint8)
+        display[:, :w] = frame
+        create_side_panel(gesture, gesture_color, fps, inference_ms,
+                          h, is_flashing, num_hands,
+                          capture_mode=args.capture, out=display[:, w:])
 
         cv2.imshow(f"Hand Detection - {source_desc}", display)
 
@@ -423,8 +521,8 @@ def main():
             break
         elif key == ord('s'):
             filename = f"hand_screenshot_{int(time.time())}.jpg"
-            cv2.imwrite(filename, display)
-            print(f"Saved {filename}")
+            # Encode and write off the main loop; copy since display is reused
+            screenshot_pool.submit(save_screenshot, filename, display.copy())
         elif key == ord('r'):
             print("Reconnecting...")
             cap = video_source.reconnect(args, cap)
@@ -436,14 +534,15 @@ def main():
                 print(f"Selected: {capture_selected_gesture}")
         elif args.capture and key == ord('c'):
             # Capture current frame
-            if capture_selected_gesture and current_landmarks:
-                save_test_case(current_landmarks, current_handedness, frame, capture_selected_gesture)
+            if capture_selected_gesture and current_points is not None:
+                save_test_case(current_points, current_handedness, frame, capture_selected_gesture)
             elif not capture_selected_gesture:
                 print("Select a gesture first (1-8)")
             else:
                 print("No hand detected - show your hand and try again")
 
     landmarker.close()
+    screenshot_pool.shutdown()  # Finish pending screenshot writes
     cap.release()
     cv2.destroyAllWindows()
 
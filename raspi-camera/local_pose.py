@@ -17,6 +17,10 @@ from mediapipe.tasks.python import vision
 import time
 import urllib.request
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice
 import video_source
 
 # Model path
@@ -28,13 +32,15 @@ ARM_RAISED_THRESHOLD = 0.15  # How much higher than shoulder to count as "raised
 ARM_OUT_THRESHOLD = 0.15     # How far out to the side to count as "out"
 
 # Gesture log
-gesture_log = []  # List of (timestamp, gesture) tuples
+gesture_log = deque(maxlen=10)  # (timestamp, gesture) tuples, oldest dropped
 last_gesture = None
 last_logged_gesture = None
 last_log_time = 0
 gesture_flash_until = 0  # Time until which to show flash effect
 MIN_LOG_INTERVAL = 2.0  # Minimum seconds between logging the same gesture
 
+PANEL_WIDTH = 280
+
 # Landmark indices (MediaPipe Pose has 33 landmarks)
 LEFT_SHOULDER = 11
 RIGHT_SHOULDER = 12
@@ -44,6 +50,17 @@ LEFT_WRIST = 15
 RIGHT_WRIST = 16
 NOSE = 0
 
+# Skeleton connections drawn on the frame (pairs of landmark indices)
+CONNECTIONS = np.array([
+    (11, 12),  # shoulders
+    (11, 13), (13, 15),  # left arm
+    (12, 14), (14, 16),  # right arm
+    (11, 23), (12, 24),  # torso
+    (23, 24),  # hips
+    (23, 25), (25, 27),  # left leg
+    (24, 26), (26, 28),  # right leg
+], dtype=np.int32)
+
 
 def download_model():
     """Download the pose landmarker model if not present."""
@@ -53,8 +70,35 @@ def download_model():
         print("Model downloaded!")
 
 
-def log_gesture(gesture):
-    """Log a gesture if it's different or enough time has passed."""
+def create_landmarker():
+    """Create the pose landmarker on the GPU delegate, falling back to CPU."""
+    def make_options(delegate):
+        base_options = python.BaseOptions(model_asset_path=MODEL_PATH, delegate=delegate)
+        return vision.PoseLandmarkerOptions(
+            base_options=base_options,
+            running_mode=vision.RunningMode.VIDEO,
+            num_poses=1,
+            min_pose_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+
+    try:
+        landmarker = vision.PoseLandmarker.create_from_options(
+            make_options(python.BaseOptions.Delegate.GPU))
+        print("Using GPU delegate")
+        return landmarker
+    except (RuntimeError, NotImplementedError) as e:
+        print(f"GPU delegate unavailable ({e}), using CPU")
+        return vision.PoseLandmarker.create_from_options(
+            make_options(python.BaseOptions.Delegate.CPU))
+
+
+def log_gesture(gesture, now=None):
+    """Log a gesture if it's different or enough time has passed.
+
+    now is a time.monotonic() reading; the main loop passes the one it took
+    for the current frame.
+    """
     global last_gesture, last_logged_gesture, last_log_time, gesture_flash_until, gesture_log
 
     # Skip non-actionable states
@@ -62,7 +106,8 @@ def log_gesture(gesture):
         last_gesture = gesture
         return False
 
-    now = time.time()
+    if now is None:
+        now = time.monotonic()
 
     # Only log if:
     # 1. Different from last logged gesture, OR
@@ -77,9 +122,6 @@ def log_gesture(gesture):
     if should_log:
         timestamp = time.strftime("%H:%M:%S")
         gesture_log.append((timestamp, gesture))
-        # Keep only last 10 entries
-        if len(gesture_log) > 10:
-            gesture_log.pop(0)
         last_logged_gesture = gesture
         last_log_time = now
         gesture_flash_until = now + 0.5  # Flash for 0.5 seconds
@@ -89,30 +131,37 @@ def log_gesture(gesture):
     return should_log
 
 
+def landmarks_to_array(landmarks):
+    """Copy MediaPipe pose landmarks into a (33, 4) array of x, y, z, visibility.
+
+    Read once per frame and pass the array to the gesture and drawing code.
+    """
+    return np.array([(lm.x, lm.y, lm.z, lm.visibility) for lm in landmarks], dtype=np.float32)
+
+
 def detect_gesture(landmarks):
-    """Analyze pose landmarks and return detected gesture."""
-    if not landmarks or len(landmarks) < 17:
+    """Analyze pose landmarks (array from landmarks_to_array) and return detected gesture."""
+    if landmarks is None or len(landmarks) < 17:
         return "NO PERSON", (128, 128, 128)
 
     # Get key landmarks (normalized 0-1 coordinates)
-    left_shoulder = landmarks[LEFT_SHOULDER]
-    right_shoulder = landmarks[RIGHT_SHOULDER]
-    left_wrist = landmarks[LEFT_WRIST]
-    right_wrist = landmarks[RIGHT_WRIST]
+    ls_x, ls_y, _, ls_vis = landmarks[LEFT_SHOULDER]
+    rs_x, rs_y, _, rs_vis = landmarks[RIGHT_SHOULDER]
+    lw_x, lw_y = landmarks[LEFT_WRIST, :2]
+    rw_x, rw_y = landmarks[RIGHT_WRIST, :2]
 
     # Check visibility (skip if key points aren't visible)
     min_visibility = 0.5
-    if (left_shoulder.visibility < min_visibility or
-        right_shoulder.visibility < min_visibility):
+    if ls_vis < min_visibility or rs_vis < min_visibility:
         return "PARTIAL VIEW", (128, 128, 128)
 
     # Arm raised detection (wrist above shoulder by threshold)
-    left_arm_raised = left_wrist.y < (left_shoulder.y - ARM_RAISED_THRESHOLD)
-    right_arm_raised = right_wrist.y < (right_shoulder.y - ARM_RAISED_THRESHOLD)
+    left_arm_raised = lw_y < (ls_y - ARM_RAISED_THRESHOLD)
+    right_arm_raised = rw_y < (rs_y - ARM_RAISED_THRESHOLD)
 
     # Arm out to side detection (wrist far from shoulder)
-    left_arm_out = left_wrist.x < (left_shoulder.x - ARM_OUT_THRESHOLD)
-    right_arm_out = right_wrist.x > (right_shoulder.x + ARM_OUT_THRESHOLD)
+    left_arm_out = lw_x < (ls_x - ARM_OUT_THRESHOLD)
+    right_arm_out = rw_x > (rs_x + ARM_OUT_THRESHOLD)
 
     # Gesture logic
     if left_arm_raised and right_arm_raised:
@@ -135,54 +184,74 @@ def detect_gesture(landmarks):
 
 
 def draw_landmarks(frame, landmarks):
-    """Draw pose landmarks and connections on frame."""
-    if not landmarks:
+    """Draw pose landmarks (array from landmarks_to_array) and connections on frame."""
+    if landmarks is None:
         return frame
 
     h, w = frame.shape[:2]
 
-    # Define connections (pairs of landmark indices)
-    connections = [
-        (11, 12),  # shoulders
-        (11, 13), (13, 15),  # left arm
-        (12, 14), (14, 16),  # right arm
-        (11, 23), (12, 24),  # torso
-        (23, 24),  # hips
-        (23, 25), (25, 27),  # left leg
-        (24, 26), (26, 28),  # right leg
-    ]
-
-    # Draw connections
-    for start_idx, end_idx in connections:
-        if start_idx < len(landmarks) and end_idx < len(landmarks):
-            start = landmarks[start_idx]
-            end = landmarks[end_idx]
-            if start.visibility > 0.5 and end.visibility > 0.5:
-                pt1 = (int(start.x * w), int(start.y * h))
-                pt2 = (int(end.x * w), int(end.y * h))
-                cv2.line(frame, pt1, pt2, (255, 255, 255), 2)
+    # Pixel coordinates and visibility for all landmarks at once
+    points = (landmarks[:, :2] * (w, h)).astype(int)
+    visible = landmarks[:, 3] > 0.5
+
+    # Draw connections where both ends are visible
+    connections = CONNECTIONS[CONNECTIONS.max(axis=1) < len(landmarks)]
+    connections = connections[visible[connections[:, 0]] & visible[connections[:, 1]]]
+    pixel = points.tolist()
+    for start_idx, end_idx in connections.tolist():
+        cv2.line(frame, pixel[start_idx], pixel[end_idx], (255, 255, 255), 2)
 
     # Draw landmarks
-    for i, lm in enumerate(landmarks):
-        if lm.visibility > 0.5:
-            cx, cy = int(lm.x * w), int(lm.y * h)
-            cv2.circle(frame, (cx, cy), 5, (0, 255, 0), -1)
+    for point in points[visible].tolist():
+        cv2.circle(frame, point, 5, (0, 255, 0), -1)
 
     return frame
 
 
-def create_side_panel(gesture, gesture_color, fps, inference_ms, frame_height, is_flashing):
-    """Create info panel showing gesture and stats."""
-    panel_width = 280
-    panel = np.zeros((frame_height, panel_width, 3), dtype=np.uint8)
+@lru_cache(maxsize=4)
+def _panel_template(frame_height):
+    """Side panel background with the static text (title, log header, guide) drawn once."""
+    panel = np.empty((frame_height, PANEL_WIDTH, 3), dtype=np.uint8)
     panel[:] = (30, 30, 30)
 
-    y_offset = 30
-
     # Title
-    cv2.putText(panel, "Pose Detection", (10, y_offset),
+    cv2.putText(panel, "Pose Detection", (10, 30),
                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-    y_offset += 45
+
+    # Gesture log header
+    cv2.putText(panel, "Gesture Log:", (10, 155),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (100, 255, 100), 1)
+
+    # Controls at bottom
+    y_offset = frame_height - 80
+    cv2.putText(panel, "Gesture Guide:", (10, y_offset),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (150, 150, 150), 1)
+    y_offset += 18
+    cv2.putText(panel, "Arms up=STOP  Arm out=POINT", (10, y_offset),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.4, (120, 120, 120), 1)
+    y_offset += 25
+    cv2.putText(panel, "r-reconnect s-screenshot q-quit", (10, y_offset),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.4, (120, 120, 120), 1)
+
+    return panel
+
+
+def create_side_panel(gesture, gesture_color, fps, inference_ms, frame_height, is_flashing, out=None):
+    """Create info panel showing gesture and stats.
+
+    If out is given (a frame_height x PANEL_WIDTH view), the panel is drawn
+    into it instead of a newly allocated array.
+    """
+    panel_width = PANEL_WIDTH
+    if out is None:
+        panel = np.empty((frame_height, panel_width, 3), dtype=np.uint8)
+    else:
+        panel = out
+
+    # Static background and text
+    np.copyto(panel, _panel_template(frame_height))
+
+    y_offset = 75
 
     # Current gesture - large and prominent with flash effect
     if is_flashing:
@@ -202,31 +271,22 @@ def create_side_panel(gesture, gesture_color, fps, inference_ms, frame_height, i
                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
     y_offset += 35
 
-    # Gesture log
-    cv2.putText(panel, "Gesture Log:", (10, y_offset),
-               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (100, 255, 100), 1)
+    # Show recent gestures below the log header (newest first)
     y_offset += 22
-
-    # Show recent gestures (newest first)
-    for timestamp, logged_gesture in reversed(gesture_log[-8:]):
+    for timestamp, logged_gesture in islice(reversed(gesture_log), 8):
         cv2.putText(panel, f"{timestamp} {logged_gesture}", (10, y_offset),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.45, (180, 180, 180), 1)
         y_offset += 18
 
-    # Controls at bottom
-    y_offset = frame_height - 80
-    cv2.putText(panel, "Gesture Guide:", (10, y_offset),
-               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (150, 150, 150), 1)
-    y_offset += 18
-    cv2.putText(panel, "Arms up=STOP  Arm out=POINT", (10, y_offset),
-               cv2.FONT_HERSHEY_SIMPLEX, 0.4, (120, 120, 120), 1)
-    y_offset += 25
-    cv2.putText(panel, "r-reconnect s-screenshot q-quit", (10, y_offset),
-               cv2.FONT_HERSHEY_SIMPLEX, 0.4, (120, 120, 120), 1)
-
     return panel
 
 
+def save_screenshot(filename, image):
+    """Write a screenshot (runs on the screenshot worker thread)."""
+    cv2.imwrite(filename, image)
+    print(f"Saved {filename}")
+
+
 def main():
     # Parse video source arguments
     args = video_source.parse_args(description="Body pose detection")
@@ -237,18 +297,10 @@ def main():
     print("Initializing pose detection...")
 
     # Create pose landmarker
-    base_options = python.BaseOptions(model_asset_path=MODEL_PATH)
-    options = vision.PoseLandmarkerOptions(
-        base_options=base_options,
-        running_mode=vision.RunningMode.VIDEO,
-        num_poses=1,
-        min_pose_detection_confidence=0.5,
-        min_tracking_confidence=0.5
-    )
-    landmarker = vision.PoseLandmarker.create_from_options(options)
-
-    # Open video source
-    cap = video_source.get_capture(args)
+    landmarker = create_landmarker()
+
+    # Open video source (read on a background thread so the loop always gets the newest frame)
+    cap = video_source.get_capture(args, threaded=True)
     source_desc = video_source.get_source_description(args)
     print("Press 'q' to quit, 's' to save screenshot, 'r' to reconnect")
     print()
@@ -266,11 +318,14 @@ def main():
     print()
 
     # FPS tracking
-    fps_time = time.time()
+    fps_time = time.monotonic()
     fps_count = 0
     fps = 0
     inference_ms = 0
     frame_timestamp = 0
+    rgb_buf = None
+    display = None
+    screenshot_pool = ThreadPoolExecutor(max_workers=1)
 
     while True:
         ret, frame = cap.read()
@@ -280,25 +335,30 @@ def main():
             cap = video_source.reconnect(args, cap)
             continue
 
-        # Convert to RGB for MediaPipe
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=frame_rgb)
+        # One clock read per frame, shared by the flash, log and FPS checks
+        now = time.monotonic()
+
+        # Convert to RGB for MediaPipe into a reused buffer (mp.Image copies the data)
+        if rgb_buf is None or rgb_buf.shape != frame.shape:
+            rgb_buf = np.empty_like(frame)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb_buf)
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_buf)
 
         # Run pose detection
-        inference_start = time.time()
+        inference_start = time.perf_counter()
         frame_timestamp += 33  # ~30fps in milliseconds
         results = landmarker.detect_for_video(mp_image, frame_timestamp)
-        inference_ms = (time.time() - inference_start) * 1000
+        inference_ms = (time.perf_counter() - inference_start) * 1000
 
         # Get landmarks and detect gesture
-        landmarks = results.pose_landmarks[0] if results.pose_landmarks else None
+        landmarks = landmarks_to_array(results.pose_landmarks[0]) if results.pose_landmarks else None
         gesture, gesture_color = detect_gesture(landmarks)
 
         # Log gesture if it's new
-        log_gesture(gesture)
+        log_gesture(gesture, now)
 
         # Check if we should flash
-        is_flashing = time.time() < gesture_flash_until
+        is_flashing = now < gesture_flash_until
 
         # Draw pose skeleton on frame
         frame = draw_landmarks(frame, landmarks)
@@ -315,16 +375,18 @@ def main():
 
         # Calculate FPS
         fps_count += 1
-        if time.time() - fps_time >= 1.0:
+        if now - fps_time >= 1.0:
             fps = fps_count
             fps_count = 0
-            fps_time = time.time()
-
-        # Create side panel
-        panel = create_side_panel(gesture, gesture_color, fps, inference_ms, frame.shape[0], is_flashing)
+            fps_time = now
 
-        # Concatenate horizontally
-        display = np.hstack([frame, panel])
+        # Compose frame and side panel into the reused display canvas
+        h, w = frame.shape[:2]
+        if display is None or display.shape[:2] != (h, w + PANEL_WIDTH):
+            display = np.empty((h, w + PANEL_WIDTH, 3), dtype=np.uint8)
+        display[:, :w] = frame
+        create_side_panel(gesture, gesture_color, fps, inference_ms, h, is_flashing,
+                          out=display[:, w:])
 
         cv2.imshow(f"Pose Detection - {source_desc}", display)
 
@@ -334,13 +396,14 @@ def main():
             break
         elif key == ord('s'):
             filename = f"pose_screenshot_{int(time.time())}.jpg"
-            cv2.imwrite(filename, display)
-            print(f"Saved {filename}")
+            # Encode and write off the main loop; copy since display is reused
+            screenshot_pool.submit(save_screenshot, filename, display.copy())
         elif key == ord('r'):
             print("Reconnecting...")
             cap = video_source.reconnect(args, cap)
 
     landmarker.close()
+    screenshot_pool.shutdown()  # Finish pending screenshot writes
     cap.release()
     cv2.destroyAllWindows()
 
@@ -11,20 +11,43 @@ Usage:
 
 import cv2
 import numpy as np
+import os
+import shutil
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import torch
 from ultralytics import YOLO
 import video_source
 
+# Optional: compile the tracker's IoU matching to native code
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 # YOLO settings
 CONFIDENCE_THRESHOLD = 0.5
 MODEL_SIZE = "n"  # n=nano (fastest), s=small, m=medium, l=large, x=extra large
+USE_INT8 = True  # Run an INT8-quantized OpenVINO export (created on first run)
+INFER_SIZE = 480  # Frames are downscaled so the long side is this many pixels before inference
 PERSISTENCE_FRAMES = 5  # Keep detections visible for N frames after disappearing
+INFER_EVERY_N = 2  # Run YOLO on every Nth batch; the tracker holds boxes in between
+BATCH_SIZE = 1  # Frames per YOLO call; 2 raises throughput but adds a frame of latency
+# The export has a fixed input shape, so it is re-created if the size or batch changes
+INT8_MODEL_DIR = f"yolov8{MODEL_SIZE}_int8_{INFER_SIZE}_b{BATCH_SIZE}_openvino_model"
+PANEL_WIDTH = 280
 
 # Class filtering - set ONE of these (leave other empty)
 # Use class names from COCO dataset (see list below)
 INCLUDE_CLASSES = []
 EXCLUDE_CLASSES = ["tv", "laptop", "mouse", "remote", "keyboard", "cell phone"]
 
+# Consistent color per COCO class id (own RNG so the global numpy RNG is untouched)
+CLASS_COLORS = [tuple(int(c) for c in np.random.default_rng(i).integers(100, 255, 3))
+                for i in range(80)]
+_allowed_ids = None  # Class ids passing the filters above (see allowed_class_ids)
+
 # Common COCO classes for reference:
 # People: person
 # Vehicles: bicycle, car, motorcycle, airplane, bus, train, truck, boat
@@ -35,6 +58,42 @@ EXCLUDE_CLASSES = ["tv", "laptop", "mouse", "remote", "keyboard", "cell phone"]
 # Food: banana, apple, sandwich, orange, broccoli, carrot, hot dog, pizza, donut, cake
 
 
+if njit is not None:
+    @njit(cache=True)
+    def _match_boxes_native(det_boxes, track_boxes, iou_threshold):
+        """Greedy one-to-one IoU matching; returns each detection's track index or -1."""
+        n, m = det_boxes.shape[0], track_boxes.shape[0]
+        iou = np.zeros(n * m, dtype=np.float32)
+        for d in range(n):
+            dx1, dy1, dx2, dy2 = det_boxes[d, 0], det_boxes[d, 1], det_boxes[d, 2], det_boxes[d, 3]
+            d_area = (dx2 - dx1) * (dy2 - dy1)
+            for t in range(m):
+                tx1, ty1, tx2, ty2 = track_boxes[t, 0], track_boxes[t, 1], track_boxes[t, 2], track_boxes[t, 3]
+                iw = min(dx2, tx2) - max(dx1, tx1)
+                ih = min(dy2, ty2) - max(dy1, ty1)
+                if iw <= 0 or ih <= 0:
+                    continue
+                inter = iw * ih
+                union = d_area + (tx2 - tx1) * (ty2 - ty1) - inter
+                if union > 0:
+                    iou[d * m + t] = inter / union
+
+        # Compare in float32 like the numpy path does
+        threshold = np.float32(iou_threshold)
+        matches = np.full(n, -1, dtype=np.int32)
+        used = np.zeros(m, dtype=np.bool_)
+        for flat_idx in np.argsort(iou)[::-1]:
+            if iou[flat_idx] <= threshold:
+                break
+            d, t = flat_idx // m, flat_idx % m
+            if matches[d] == -1 and not used[t]:
+                matches[d] = t
+                used[t] = True
+        return matches
+else:
+    _match_boxes_native = None
+
+
 class DetectionTracker:
     """Tracks detections across frames to reduce flickering."""
 
@@ -44,56 +103,82 @@ class DetectionTracker:
         self.tracked = {}  # key -> {detection, last_seen, age}
         self.frame_count = 0
 
-    def _iou(self, box1, box2):
-        """Calculate intersection over union of two boxes."""
-        x1 = max(box1[0], box2[0])
-        y1 = max(box1[1], box2[1])
-        x2 = min(box1[2], box2[2])
-        y2 = min(box1[3], box2[3])
-
-        inter = max(0, x2 - x1) * max(0, y2 - y1)
-        area1 = (box1[2] - box1[0]) * (box1[3] - box1[1])
-        area2 = (box2[2] - box2[0]) * (box2[3] - box2[1])
-        union = area1 + area2 - inter
-
-        return inter / union if union > 0 else 0
-
-    def _find_match(self, detection):
-        """Find existing tracked detection that matches this one."""
-        best_key = None
-        best_iou = self.iou_threshold
-
-        for key, tracked in self.tracked.items():
-            if tracked['detection']['label'] != detection['label']:
-                continue
-            iou = self._iou(tracked['detection']['box'], detection['box'])
-            if iou > best_iou:
-                best_iou = iou
-                best_key = key
-
-        return best_key
+        # Compile the native matcher now rather than on the first busy frame
+        if _match_boxes_native is not None:
+            empty = np.zeros((0, 4), dtype=np.float32)
+            _match_boxes_native(empty, empty, float(iou_threshold))
+
+    @staticmethod
+    def _iou_matrix(boxes1, boxes2):
+        """Intersection over union for every pair: (N, 4) x (M, 4) -> (N, M)."""
+        x1 = np.maximum(boxes1[:, None, 0], boxes2[None, :, 0])
+        y1 = np.maximum(boxes1[:, None, 1], boxes2[None, :, 1])
+        x2 = np.minimum(boxes1[:, None, 2], boxes2[None, :, 2])
+        y2 = np.minimum(boxes1[:, None, 3], boxes2[None, :, 3])
+
+        inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+        area1 = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+        area2 = (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1])
+        union = area1[:, None] + area2[None, :] - inter
+
+        return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+    def _match(self, detections, track_keys):
+        """Match same-label detections to tracks, greedily by highest IoU.
+
+        Returns a list with the matched track key (or None) for each detection.
+        Each track is matched at most once.
+        """
+        matches = [None] * len(detections)
+        if not track_keys:
+            return matches
+
+        det_boxes = np.array([d['box'] for d in detections], dtype=np.float32)
+        track_boxes = np.array([self.tracked[k]['detection']['box'] for k in track_keys],
+                               dtype=np.float32)
+        if _match_boxes_native is not None:
+            indices = _match_boxes_native(det_boxes, track_boxes, float(self.iou_threshold))
+            return [track_keys[t] if t >= 0 else None for t in indices]
+
+        iou = self._iou_matrix(det_boxes, track_boxes)
+
+        used_tracks = set()
+        for flat_idx in np.argsort(iou, axis=None)[::-1]:
+            d, t = divmod(int(flat_idx), len(track_keys))
+            if iou[d, t] <= self.iou_threshold:
+                break
+            if matches[d] is None and t not in used_tracks:
+                matches[d] = track_keys[t]
+                used_tracks.add(t)
+
+        return matches
 
     def update(self, detections):
         """Update tracker with new detections, return smoothed detections."""
         self.frame_count += 1
-        matched_keys = set()
 
-        # Match new detections to existing tracks
+        # Only boxes with the same label can match, so match label by label
+        tracks_by_label = {}
+        for key, tracked in self.tracked.items():
+            tracks_by_label.setdefault(tracked['detection']['label'], []).append(key)
+        dets_by_label = {}
         for det in detections:
-            match_key = self._find_match(det)
-            if match_key:
-                # Update existing track
-                self.tracked[match_key]['detection'] = det
-                self.tracked[match_key]['last_seen'] = self.frame_count
-                matched_keys.add(match_key)
-            else:
-                # Create new track
-                new_key = f"{det['label']}_{self.frame_count}_{id(det)}"
-                self.tracked[new_key] = {
-                    'detection': det,
-                    'last_seen': self.frame_count
-                }
-                matched_keys.add(new_key)
+            dets_by_label.setdefault(det['label'], []).append(det)
+
+        for label, dets in dets_by_label.items():
+            matches = self._match(dets, tracks_by_label.get(label, []))
+            for det, match_key in zip(dets, matches):
+                if match_key:
+                    # Update existing track
+                    self.tracked[match_key]['detection'] = det
+                    self.tracked[match_key]['last_seen'] = self.frame_count
+                else:
+                    # Create new track
+                    new_key = f"{det['label']}_{self.frame_count}_{id(det)}"
+                    self.tracked[new_key] = {
+                        'detection': det,
+                        'last_seen': self.frame_count
+                    }
 
         # Remove old tracks that have expired
         expired = []
@@ -107,18 +192,45 @@ class DetectionTracker:
         return [t['detection'] for t in self.tracked.values()]
 
 
-def create_side_panel(detections, fps, inference_ms, frame_height):
-    """Create an info panel showing detection stats."""
-    panel_width = 280
-    panel = np.zeros((frame_height, panel_width, 3), dtype=np.uint8)
+@lru_cache(maxsize=4)
+def _panel_template(frame_height):
+    """Side panel background with the static text (title, controls) drawn once."""
+    panel = np.empty((frame_height, PANEL_WIDTH, 3), dtype=np.uint8)
     panel[:] = (30, 30, 30)
 
-    y_offset = 30
-
     # Title
-    cv2.putText(panel, "YOLOv8 Detection", (10, y_offset),
+    cv2.putText(panel, "YOLOv8 Detection", (10, 30),
                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-    y_offset += 40
+
+    # Instructions at bottom
+    y_offset = frame_height - 80
+    cv2.putText(panel, "Controls:", (10, y_offset),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (150, 150, 150), 1)
+    y_offset += 20
+    cv2.putText(panel, "r - reconnect (fix lag)", (10, y_offset),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (150, 150, 150), 1)
+    y_offset += 20
+    cv2.putText(panel, "s - screenshot  q - quit", (10, y_offset),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (150, 150, 150), 1)
+
+    return panel
+
+
+def create_side_panel(detections, fps, inference_ms, frame_height, out=None):
+    """Create an info panel showing detection stats.
+
+    If out is given (a frame_height x PANEL_WIDTH view), the panel is drawn
+    into it instead of a newly allocated array.
+    """
+    if out is None:
+        panel = np.empty((frame_height, PANEL_WIDTH, 3), dtype=np.uint8)
+    else:
+        panel = out
+
+    # Static background and text
+    np.copyto(panel, _panel_template(frame_height))
+
+    y_offset = 70
 
     # FPS and inference time
     cv2.putText(panel, f"FPS: {fps}", (10, y_offset),
@@ -153,56 +265,47 @@ def create_side_panel(detections, fps, inference_ms, frame_height):
         cv2.putText(panel, f"  ... and {len(detections) - 10} more", (10, y_offset),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (150, 150, 150), 1)
 
-    # Instructions at bottom
-    y_offset = frame_height - 80
-    cv2.putText(panel, "Controls:", (10, y_offset),
-               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (150, 150, 150), 1)
-    y_offset += 20
-    cv2.putText(panel, "r - reconnect (fix lag)", (10, y_offset),
-               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (150, 150, 150), 1)
-    y_offset += 20
-    cv2.putText(panel, "s - screenshot  q - quit", (10, y_offset),
-               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (150, 150, 150), 1)
-
     return panel
 
 
-def extract_detections(results):
-    """Extract detection info from YOLO results."""
+def allowed_class_ids(names):
+    """Class ids that pass INCLUDE_CLASSES/EXCLUDE_CLASSES, built once per model."""
+    global _allowed_ids
+    if _allowed_ids is None:
+        ids = [i for i, name in names.items()
+               if (not INCLUDE_CLASSES or name in INCLUDE_CLASSES)
+               and name not in EXCLUDE_CLASSES]
+        _allowed_ids = np.array(ids, dtype=np.int32)
+    return _allowed_ids
+
+
+def extract_detections(results, scale=1.0):
+    """Extract detection info from YOLO results.
+
+    Box coordinates are multiplied by scale to map them back onto the
+    original frame when inference ran on a downscaled copy.
+    """
     detections = []
 
     for result in results:
         boxes = result.boxes
-        if boxes is None:
+        if boxes is None or len(boxes) == 0:
             continue
 
-        for box in boxes:
-            # Get box coordinates
-            x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().astype(int)
-
-            # Get class and confidence
-            cls_id = int(box.cls[0])
-            conf = float(box.conf[0])
-            label = result.names[cls_id]
+        # Pull whole tensors off the device once instead of per box
+        xyxy = (boxes.xyxy.cpu().numpy() * scale).astype(np.int32)
+        cls = boxes.cls.cpu().numpy().astype(np.int32)
+        conf = boxes.conf.cpu().numpy()
 
-            # Skip low confidence detections
-            if conf < CONFIDENCE_THRESHOLD:
-                continue
-
-            # Apply class filtering
-            if INCLUDE_CLASSES and label not in INCLUDE_CLASSES:
-                continue
-            if EXCLUDE_CLASSES and label in EXCLUDE_CLASSES:
-                continue
-
-            # Generate consistent color for this class
-            np.random.seed(cls_id)
-            color = tuple(int(c) for c in np.random.randint(100, 255, 3))
+        # Skip low confidence detections and filtered classes
+        keep = (conf >= CONFIDENCE_THRESHOLD) & np.isin(cls, allowed_class_ids(result.names))
 
+        for (x1, y1, x2, y2), cls_id, c in zip(xyxy[keep].tolist(), cls[keep].tolist(),
+                                               conf[keep].tolist()):
             detections.append({
-                'label': label,
-                'confidence': conf,
-                'color': color,
+                'label': result.names[cls_id],
+                'confidence': c,
+                'color': CLASS_COLORS[cls_id],
                 'box': (x1, y1, x2, y2),
                 'cls_id': cls_id
             })
@@ -210,6 +313,25 @@ def extract_detections(results):
     return detections
 
 
+def downscale_for_inference(frame):
+    """Shrink frame so its long side is INFER_SIZE (aspect kept, letterboxed by YOLO).
+
+    Returns the image to run inference on and the factor that maps its box
+    coordinates back onto frame.
+    """
+    scale = max(max(frame.shape[:2]) / INFER_SIZE, 1.0)
+    if scale == 1.0:
+        return frame, scale
+    size = (round(frame.shape[1] / scale), round(frame.shape[0] / scale))
+    return cv2.resize(frame, size, interpolation=cv2.INTER_LINEAR), scale
+
+
+@lru_cache(maxsize=4096)
+def _text_size(text):
+    """Size of a box label; labels repeat (~100 confidence values per class)."""
+    return cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)[0]
+
+
 def draw_detections(frame, detections):
     """Draw bounding boxes and labels on frame."""
     for det in detections:
@@ -223,7 +345,7 @@ def draw_detections(frame, detections):
 
         # Draw label background
         label_text = f"{label} {conf:.0%}"
-        (w, h), _ = cv2.getTextSize(label_text, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+        w, h = _text_size(label_text)
         cv2.rectangle(frame, (x1, y1 - h - 10), (x1 + w + 10, y1), color, -1)
 
         # Draw label text
@@ -233,20 +355,76 @@ def draw_detections(frame, detections):
     return frame
 
 
+def pick_device():
+    """Use Apple's GPU (MPS) when available, otherwise the CPU."""
+    if torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+def int8_export_complete():
+    """True if INT8_MODEL_DIR holds a finished export (an interrupted one lacks these files)."""
+    stem = f"yolov8{MODEL_SIZE}"
+    return all(os.path.exists(os.path.join(INT8_MODEL_DIR, name))
+               for name in (f"{stem}.xml", f"{stem}.bin", "metadata.yaml"))
+
+
+def load_model(device="cpu"):
+    """Load the YOLO model, preferring the INT8 OpenVINO export if enabled.
+
+    The export is created once with a static INFER_SIZE x INFER_SIZE,
+    BATCH_SIZE input shape so OpenVINO can specialize every layer for it
+    (needs the openvino package and downloads the coco128 calibration
+    images). Falls back to the PyTorch weights on failure.
+    On MPS the PyTorch weights are used instead, run in FP16 on the GPU.
+    """
+    weights = f"yolov8{MODEL_SIZE}.pt"
+    if not USE_INT8 or device == "mps":
+        return YOLO(weights)
+
+    if not int8_export_complete():
+        if os.path.exists(INT8_MODEL_DIR):
+            print(f"Removing incomplete export {INT8_MODEL_DIR}")
+            shutil.rmtree(INT8_MODEL_DIR)
+        print("Exporting INT8 OpenVINO model (one-time, may take a few minutes)...")
+        try:
+            exported = YOLO(weights).export(format="openvino", int8=True, data="coco128.yaml",
+                                            imgsz=INFER_SIZE, batch=BATCH_SIZE, dynamic=False)
+            if os.path.abspath(exported) != os.path.abspath(INT8_MODEL_DIR):
+                os.replace(exported, INT8_MODEL_DIR)
+        except Exception as e:
+            print(f"INT8 export failed ({e}), using {weights}")
+            return YOLO(weights)
+
+    try:
+        return YOLO(INT8_MODEL_DIR, task="detect")
+    except Exception as e:
+        print(f"Could not load {INT8_MODEL_DIR} ({e}), using {weights}")
+        return YOLO(weights)
+
+
+def save_screenshot(filename, image):
+    """Write a screenshot (runs on the screenshot worker thread)."""
+    cv2.imwrite(filename, image)
+    print(f"Saved {filename}")
+
+
 def main():
     # Parse video source arguments
     args = video_source.parse_args(description="YOLOv8 object detection")
 
-    print(f"Loading YOLOv8{MODEL_SIZE} model...")
-    model = YOLO(f"yolov8{MODEL_SIZE}.pt")
+    device = pick_device()
+    half = device == "mps"  # FP16 only helps on the GPU
+    print(f"Loading YOLOv8{MODEL_SIZE} model ({device})...")
+    model = load_model(device)
     print("Model loaded!")
     print()
 
-    # Initialize detection tracker for smoothing
-    tracker = DetectionTracker(persistence_frames=PERSISTENCE_FRAMES)
+    # Initialize detection tracker for smoothing (persistence counts displayed frames)
+    tracker = DetectionTracker(persistence_frames=PERSISTENCE_FRAMES * INFER_EVERY_N)
 
-    # Open video source
-    cap = video_source.get_capture(args)
+    # Open video source (read on a background thread so decoding overlaps inference)
+    cap = video_source.get_capture(args, threaded=True)
     source_desc = video_source.get_source_description(args)
     print("Press 'q' to quit, 's' to save screenshot, 'r' to reconnect")
     print()
@@ -264,54 +442,75 @@ def main():
     fps_count = 0
     fps = 0
     inference_ms = 0
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("Lost connection, reconnecting...")
-            time.sleep(1)
-            cap = video_source.reconnect(args, cap)
-            continue
-
-        # Run YOLO inference
-        inference_start = time.time()
-        results = model(frame, verbose=False)
-        inference_ms = (time.time() - inference_start) * 1000
-
-        # Extract and track detections (smooths flickering)
-        raw_detections = extract_detections(results)
-        detections = tracker.update(raw_detections)
-
-        # Draw detections
-        frame = draw_detections(frame, detections)
-
-        # Calculate FPS
-        fps_count += 1
-        if time.time() - fps_time >= 1.0:
-            fps = fps_count
-            fps_count = 0
-            fps_time = time.time()
-
-        # Create side panel
-        panel = create_side_panel(detections, fps, inference_ms, frame.shape[0])
-
-        # Concatenate horizontally
-        display = np.hstack([frame, panel])
-
-        cv2.imshow(f"YOLOv8 Detection - {source_desc}", display)
-
-        # Handle keyboard
-        key = cv2.waitKey(1) & 0xFF
-        if key == ord('q'):
-            break
-        elif key == ord('s'):
-            filename = f"yolo_screenshot_{int(time.time())}.jpg"
-            cv2.imwrite(filename, display)
-            print(f"Saved {filename}")
-        elif key == ord('r'):
-            print("Reconnecting...")
-            cap = video_source.reconnect(args, cap)
-
+    display = None
+    screenshot_pool = ThreadPoolExecutor(max_workers=1)
+    batch_idx = 0
+    running = True
+
+    while running:
+        # Read a batch of frames (BATCH_SIZE 1 is plain frame-by-frame)
+        frames = []
+        while len(frames) < BATCH_SIZE:
+            ret, frame = cap.read()
+            if not ret:
+                print("Lost connection, reconnecting...")
+                time.sleep(1)
+                cap = video_source.reconnect(args, cap)
+                continue
+            frames.append(frame)
+
+        if batch_idx % INFER_EVERY_N == 0:
+            # Run YOLO inference on the whole batch in one forward pass
+            inputs = [downscale_for_inference(frame) for frame in frames]
+            inference_start = time.time()
+            results = model.predict([small for small, _ in inputs], verbose=False,
+                                    device=device, half=half, imgsz=INFER_SIZE)
+            inference_ms = (time.time() - inference_start) * 1000 / len(frames)
+
+            batch_detections = [extract_detections([result], scale)
+                                for result, (_, scale) in zip(results, inputs)]
+        else:
+            # Skipped batch: just age the tracks and redraw the live ones
+            batch_detections = [[] for _ in frames]
+        batch_idx += 1
+
+        for frame, raw_detections in zip(frames, batch_detections):
+            # Track detections (smooths flickering)
+            detections = tracker.update(raw_detections)
+
+            # Draw detections
+            frame = draw_detections(frame, detections)
+
+            # Calculate FPS
+            fps_count += 1
+            if time.time() - fps_time >= 1.0:
+                fps = fps_count
+                fps_count = 0
+                fps_time = time.time()
+
+            # Compose frame and side panel into the reused display canvas
+            h, w = frame.shape[:2]
+            if display is None or display.shape[:2] != (h, w + PANEL_WIDTH):
+                display = np.empty((h, w + PANEL_WIDTH, 3), dtype=np.uint8)
+            display[:, :w] = frame
+            create_side_panel(detections, fps, inference_ms, h, out=display[:, w:])
+
+            cv2.imshow(f"YOLOv8 Detection - {source_desc}", display)
+
+            # Handle keyboard
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord('q'):
+                running = False
+                break
+            elif key == ord('s'):
+                filename = f"yolo_screenshot_{int(time.time())}.jpg"
+                # Encode and write off the main loop; copy since display is reused
+                screenshot_pool.submit(save_screenshot, filename, display.copy())
+            elif key == ord('r'):
+                print("Reconnecting...")
+                cap = video_source.reconnect(args, cap)
+
+    screenshot_pool.shutdown()  # Finish pending screenshot writes
     cap.release()
     cv2.destroyAllWindows()
 
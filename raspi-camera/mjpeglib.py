@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Shared MJPEG streaming for stream.py and stream_raw.py.
+
+The camera's hardware JPEG encoder writes into a StreamingOutput; every client is
+sent the same JPEG as a multipart/x-mixed-replace stream on :8080.
+Deploy alongside the stream scripts.
+"""
+
+from flask import Flask, Response
+from picamera2 import Picamera2
+from picamera2.encoders import MJPEGEncoder
+from picamera2.outputs import FileOutput
+from threading import Condition
+import io
+import os
+
+# Optional: production WSGI server (pip install waitress)
+try:
+    from waitress import serve
+except ImportError:
+    serve = None
+
+PORT = 8080
+# waitress worker threads. Each viewer holds one for as long as it watches, so
+# this many viewers leave none free for the index page or new viewers
+HTTP_THREADS = int(os.environ.get('STREAM_THREADS', '8'))
+
+# Multipart framing around each JPEG
+FRAME_PREFIX = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+FRAME_SUFFIX = b'\r\n'
+
+
+class StreamingOutput(io.BufferedIOBase):
+    """Holds the latest JPEG from the encoder and wakes clients waiting for it."""
+
+    def __init__(self):
+        self.frame = None
+        self.condition = Condition()
+
+    def write(self, buf):
+        with self.condition:
+            self.frame = buf
+            self.condition.notify_all()
+
+
+def start_camera(output, main):
+    """Configure the camera with the given main stream and start JPEG encoding into output."""
+    camera = Picamera2()
+    camera.configure(camera.create_video_configuration(main=main))
+    # Encode each frame once on the hardware JPEG encoder; all clients share the result
+    camera.start_recording(MJPEGEncoder(), FileOutput(output))
+    return camera
+
+
+def generate_frames(output):
+    """Generator that yields MJPEG frames."""
+    while True:
+        with output.condition:
+            output.condition.wait()
+            frame = output.frame
+        # Separate writes rather than concatenating, which would copy the JPEG
+        yield FRAME_PREFIX
+        yield frame
+        yield FRAME_SUFFIX
+
+
+def create_app(output, index_html):
+    """Flask app serving index_html at / and the MJPEG stream at /stream."""
+    app = Flask(__name__)
+
+    @app.route('/')
+    def index():
+        return index_html
+
+    @app.route('/stream')
+    def stream():
+        return Response(
+            generate_frames(output),
+            mimetype='multipart/x-mixed-replace; boundary=frame'
+        )
+
+    return app
+
+
+def run(app):
+    """Serve app on PORT, via waitress if installed."""
+    if serve is not None:
+        print(f"Serving at most {HTTP_THREADS} viewers (STREAM_THREADS)")
+        serve(app, host='0.0.0.0', port=PORT, threads=HTTP_THREADS)
+    else:
+        app.run(host='0.0.0.0', port=PORT, threaded=True)
@@ -7,104 +7,33 @@ Use the results to determine how long to run motors for specific
 turns (90°, 180°) and distances.
 
 Requires pigpio daemon: sudo systemctl start pigpiod
+(falls back to lgpio without the daemon if the lgpio package is installed)
 
 Usage:
     python3 motor_calibrate.py
 """
 
-import pigpio
-import time
+import re
 import sys
+import time
+from motorlib import (MotorController, set_realtime_priority, sleep_until,
+                      NEUTRAL, DEFAULT_SPEED, FORWARD_TRIM)
 
-# GPIO pin assignments
-LEFT_MOTOR = 18   # Pin 12
-RIGHT_MOTOR = 13  # Pin 33
-
-# Motor direction
-LEFT_INVERTED = True
-RIGHT_INVERTED = True
-
-# PWM
-NEUTRAL = 1500
-DEFAULT_SPEED = 110  # Same as follow_red.py
-FORWARD_TRIM = 1.8   # Positive = boost right motor (corrects rightward drift)
-
-# Calibration results (at DEFAULT_SPEED)
-FORWARD_CM_PER_SEC = 20.0
-DEGREES_PER_SEC_LEFT = 55.4   # 360° in ~6.5s at speed 110
-DEGREES_PER_SEC_RIGHT = 102.9  # 360° in ~3.5s at speed 110
-
-
-class MotorController:
-    def __init__(self):
-        self.pi = pigpio.pi()
-        if not self.pi.connected:
-            raise RuntimeError("Could not connect to pigpio daemon. Run: sudo systemctl start pigpiod")
-        self.stop()
-
-    def set_motors(self, left_us, right_us):
-        if LEFT_INVERTED:
-            left_us = 3000 - left_us
-        if RIGHT_INVERTED:
-            right_us = 3000 - right_us
-        self.pi.set_servo_pulsewidth(LEFT_MOTOR, round(left_us))
-        self.pi.set_servo_pulsewidth(RIGHT_MOTOR, round(right_us))
-
-    def stop(self):
-        self.set_motors(NEUTRAL, NEUTRAL)
-
-    def turn_left(self, speed=DEFAULT_SPEED):
-        self.set_motors(NEUTRAL - speed, NEUTRAL + speed)
-
-    def turn_right(self, speed=DEFAULT_SPEED):
-        self.set_motors(NEUTRAL + speed, NEUTRAL - speed)
-
-    def forward(self, speed=DEFAULT_SPEED, trim=FORWARD_TRIM):
-        self.set_motors(NEUTRAL + speed - trim, NEUTRAL + speed + trim)
-
-    def reverse(self, speed=DEFAULT_SPEED, trim=FORWARD_TRIM):
-        self.set_motors(NEUTRAL - speed - trim, NEUTRAL - speed + trim)
-
-    def forward_cm(self, cm):
-        duration = cm / FORWARD_CM_PER_SEC
-        self.forward()
-        time.sleep(duration)
-        self.stop()
-
-    def reverse_cm(self, cm):
-        duration = cm / FORWARD_CM_PER_SEC
-        self.reverse()
-        time.sleep(duration)
-        self.stop()
-
-    def turn_degrees(self, degrees):
-        if degrees > 0:
-            if DEGREES_PER_SEC_RIGHT is None:
-                raise RuntimeError("DEGREES_PER_SEC_RIGHT not calibrated yet. Run turn calibration first.")
-            duration = degrees / DEGREES_PER_SEC_RIGHT
-            self.turn_right()
-        else:
-            if DEGREES_PER_SEC_LEFT is None:
-                raise RuntimeError("DEGREES_PER_SEC_LEFT not calibrated yet. Run turn calibration first.")
-            duration = abs(degrees) / DEGREES_PER_SEC_LEFT
-            self.turn_left()
-        time.sleep(duration)
-        self.stop()
-
-    def cleanup(self):
-        self.stop()
-        time.sleep(0.1)
-        self.pi.set_servo_pulsewidth(LEFT_MOTOR, 0)
-        self.pi.set_servo_pulsewidth(RIGHT_MOTOR, 0)
-        self.pi.stop()
+# Distance answers like "15cm", "6 in" or "12.5"
+_PARSE = re.compile(r'(\d*\.?\d+)\s*([a-zA-Z]*)')
 
 
 def countdown(seconds=3):
     """Countdown before running a test."""
-    for i in range(seconds, 0, -1):
-        print(f"  {i}...")
-        time.sleep(1)
-    print("  GO!")
+    ticks = [f"  {i}...\n" for i in range(seconds, 0, -1)]
+    # Tick on fixed deadlines so slow console writes don't stretch the countdown
+    start = time.monotonic()
+    for n, tick in enumerate(ticks):
+        sys.stdout.write(tick)
+        sys.stdout.flush()
+        sleep_until(start + n + 1)
+    sys.stdout.write("  GO!\n")
+    sys.stdout.flush()
 
 
 def run_test(motors, action, speed, duration):
@@ -117,9 +46,7 @@ def run_test(motors, action, speed, duration):
     }[action]
 
     countdown()
-    action_fn(speed)
-    time.sleep(duration)
-    motors.stop()
+    motors.run_for(duration, action_fn, speed)
     print(f"  STOP - ran {action} at speed {speed} for {duration:.2f}s")
 
 
@@ -148,7 +75,7 @@ def turn_calibration(motors):
                 time_for_90 = 90.0 / deg_per_sec
                 time_for_180 = 180.0 / deg_per_sec
                 print(f"  => 90° would take {time_for_90:.2f}s, 180° would take {time_for_180:.2f}s")
-                print(f"  Update {const_name} = {deg_per_sec:.1f} to make permanent.")
+                print(f"  Update {const_name} = {deg_per_sec:.1f} in motorlib.py to make permanent.")
         print()
 
 
@@ -170,12 +97,12 @@ def forward_calibration(motors):
         run_test(motors, "forward", speed, dur)
         result = input(f"  How far did it go? (e.g. '15cm' or '6in', or Enter to skip): ").strip()
         if result:
-            # Parse number from input
-            num = ''.join(c for c in result if c.isdigit() or c == '.')
-            if num:
-                dist = float(num)
+            # Parse number and unit from input
+            m = _PARSE.search(result)
+            if m:
+                dist = float(m.group(1))
                 dist_per_sec = dist / dur
-                unit = ''.join(c for c in result if c.isalpha()) or 'units'
+                unit = m.group(2) or 'units'
                 print(f"  => {dist_per_sec:.1f} {unit}/sec at speed {speed}")
     print()
 
@@ -212,15 +139,13 @@ def trim_calibration(motors):
         print(f"  Forward at speed={speed}, trim={trim} for {duration}s")
         print(f"  Left motor: {NEUTRAL + speed - trim}µs, Right motor: {NEUTRAL + speed + trim}µs")
         countdown()
-        motors.forward(speed, trim)
-        time.sleep(duration)
-        motors.stop()
+        motors.run_for(duration, motors.forward, speed, trim)
         print(f"  STOP")
 
         straight = input("  Did it drive straight? (y/n/Enter to try again): ").strip().lower()
         if straight == 'y':
             print(f"\n  => Good trim value: {trim}")
-            print(f"  Update FORWARD_TRIM = {trim} in the script to make it permanent.")
+            print(f"  Update FORWARD_TRIM = {trim} in motorlib.py to make it permanent.")
             break
         print()
 
@@ -276,6 +201,13 @@ def main():
         print(f"Error: {e}")
         sys.exit(1)
 
+    # Real-time scheduling only here: the process mostly blocks on input(), so it
+    # can't starve pigpiod, and importers of MotorController keep normal priority
+    if set_realtime_priority():
+        print("Using real-time scheduling for motor timing")
+    else:
+        print("Note: run with sudo for real-time scheduling (more consistent timing)")
+
     print("Motors initialized. Place the robot on a flat surface.")
     print()
 
@@ -0,0 +1,275 @@
+"""
+Shared motor control for the tinyESC v3.0 drive motors.
+
+Used by motor_test.py, motor_calibrate.py and follow_red.py; copy it to the
+Pi alongside them.
+
+Requires pigpio daemon: sudo systemctl start pigpiod
+(falls back to lgpio without the daemon if the lgpio package is installed)
+"""
+
+import pigpio
+import os
+import time
+
+# Optional: drive the servos in-process when pigpiod isn't running
+try:
+    import lgpio
+except ImportError:
+    lgpio = None
+
+# GPIO pin assignments
+LEFT_MOTOR = 18   # Pin 12
+RIGHT_MOTOR = 13  # Pin 33
+
+# Motor direction (set to True if motor runs backward)
+LEFT_INVERTED = True
+RIGHT_INVERTED = True
+
+# PWM
+NEUTRAL = 1500
+PW_MIN = 1000  # Full speed one way (pulse widths are clamped to this range)
+PW_MAX = 2000  # Full speed the other way
+SERVO_FREQ = 50  # Hz (20 ms period)
+NEUTRAL_HOLD = 0.1  # Seconds of neutral pulses before the signal is cut, so the ESCs register the stop
+# GPIO 18 and 13 are the PWM0/PWM1 channels, so pulses can come from the PWM
+# peripheral itself rather than pigpio's DMA-timed servo pulses
+USE_HARDWARE_PWM = True
+DEFAULT_SPEED = 110
+FORWARD_TRIM = 1.8   # Positive = boost right motor (corrects rightward drift)
+
+# Calibration results (at DEFAULT_SPEED, measured with motor_calibrate.py)
+FORWARD_CM_PER_SEC = 20.0
+DEGREES_PER_SEC_LEFT = 55.4   # 360° in ~6.5s at speed 110
+DEGREES_PER_SEC_RIGHT = 102.9  # 360° in ~3.5s at speed 110
+
+
+def motor_targets(action, speed, trim=FORWARD_TRIM):
+    """Logical (left_us, right_us) for a motion, before motor inversion."""
+    if action == "left":
+        return NEUTRAL - speed, NEUTRAL + speed
+    if action == "right":
+        return NEUTRAL + speed, NEUTRAL - speed
+    if action == "forward":
+        return NEUTRAL + speed - trim, NEUTRAL + speed + trim
+    if action == "reverse":
+        return NEUTRAL - speed - trim, NEUTRAL - speed + trim
+    raise ValueError(f"Unknown action: {action}")
+
+
+def to_pulsewidths(left_us, right_us):
+    """Apply motor inversion, round, and clamp to the integer pulse widths pigpio takes."""
+    if LEFT_INVERTED:
+        left_us = 3000 - left_us
+    if RIGHT_INVERTED:
+        right_us = 3000 - right_us
+    return (min(max(round(left_us), PW_MIN), PW_MAX),
+            min(max(round(right_us), PW_MIN), PW_MAX))
+
+
+def set_realtime_priority(priority=20):
+    """Switch this process to SCHED_FIFO so timed motor stops aren't delayed by preemption.
+
+    Needs root or CAP_SYS_NICE; returns False and keeps normal scheduling otherwise.
+    """
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+    except (AttributeError, OSError):
+        return False
+
+    # On multi-core Pis stay on one core and leave the others to streaming/CV work
+    cpus = os.sched_getaffinity(0)
+    if len(cpus) > 1:
+        os.sched_setaffinity(0, {max(cpus)})
+    return True
+
+
+def sleep_until(deadline):
+    """Sleep until a time.monotonic() deadline."""
+    remaining = deadline - time.monotonic()
+    if remaining > 0:
+        time.sleep(remaining)
+
+
+class MotorController:
+    ACTIONS = ("left", "right", "forward", "reverse")
+    MAX_TABLE_SPEED = 300
+    COMMON_TURNS = (45, 90, 180, 360, -45, -90, -180, -360)
+
+    def __init__(self):
+        self.pi = pigpio.pi()
+        self.chip = None
+        if not self.pi.connected:
+            if lgpio is None:
+                raise RuntimeError("Could not connect to pigpio daemon. Run: sudo systemctl start pigpiod")
+            # No daemon: lgpio pulses are software-timed, so pigpio's DMA timing stays preferred
+            print("pigpiod not running, using lgpio")
+            self.pi = None
+            self.chip = lgpio.gpiochip_open(0)
+            lgpio.gpio_claim_output(self.chip, LEFT_MOTOR)
+            lgpio.gpio_claim_output(self.chip, RIGHT_MOTOR)
+
+        # Pulse widths for every (action, speed) at the default trim, inversion applied once
+        self._pw = {(action, speed): to_pulsewidths(*motor_targets(action, speed))
+                    for action in self.ACTIONS
+                    for speed in range(self.MAX_TABLE_SPEED + 1)}
+        self._stop_pw = to_pulsewidths(NEUTRAL, NEUTRAL)
+        # (duration, start) per turn angle; common angles up front, others added on first use
+        self._turns = {}
+        for degrees in self.COMMON_TURNS:
+            try:
+                self._turn_plan(degrees)
+            except RuntimeError:
+                pass  # Direction not calibrated; turn_degrees raises when it's used
+        self._script = self._store_servo_script()
+        self._last = None  # Pulse widths last sent, to skip repeated identical writes
+        self._stopped_at = None  # time.monotonic() when neutral was first sent
+        self._cleaned = False
+        self.stop()
+
+    def _store_servo_script(self):
+        """Store a pigpiod script that sets both servos, so an update is one round-trip.
+
+        Returns the script id, or None to fall back to two separate servo calls.
+        """
+        if self.pi is None:
+            return None
+        if USE_HARDWARE_PWM:
+            script = f"hp {LEFT_MOTOR} {SERVO_FREQ} p0 hp {RIGHT_MOTOR} {SERVO_FREQ} p1"
+        else:
+            script = f"s {LEFT_MOTOR} p0 s {RIGHT_MOTOR} p1"
+        try:
+            script_id = self.pi.store_script(script.encode())
+            while self.pi.script_status(script_id)[0] == pigpio.PI_SCRIPT_INITING:
+                time.sleep(0.01)
+        except pigpio.error as e:
+            print(f"pigpio script unavailable ({e}), using separate servo calls")
+            return None
+        return script_id
+
+    def _set_servo(self, gpio, pulsewidth):
+        if self.chip is not None:
+            lgpio.tx_servo(self.chip, gpio, pulsewidth)
+        elif USE_HARDWARE_PWM:
+            self.pi.hardware_PWM(gpio, SERVO_FREQ, pulsewidth * SERVO_FREQ)
+        else:
+            self.pi.set_servo_pulsewidth(gpio, pulsewidth)
+
+    def _apply(self, pulsewidths):
+        if pulsewidths == self._last:
+            return  # Already set (e.g. a control loop repeating forward())
+        left_pw, right_pw = pulsewidths
+        sent = False
+        if self._script is not None:
+            if USE_HARDWARE_PWM:
+                # Duty cycle in millionths of the period: µs * Hz
+                params = [left_pw * SERVO_FREQ, right_pw * SERVO_FREQ]
+            else:
+                params = [left_pw, right_pw]
+            try:
+                self.pi.run_script(self._script, params)
+                sent = True
+            except pigpio.error:
+                pass  # Previous run not halted yet (PI_NOT_HALTED); set them directly
+        if not sent:
+            self._set_servo(LEFT_MOTOR, left_pw)
+            self._set_servo(RIGHT_MOTOR, right_pw)
+        # Only remembered once written, so a failed write is retried by the next call
+        self._last = pulsewidths
+        self._stopped_at = time.monotonic() if pulsewidths == self._stop_pw else None
+
+    def _move(self, action, speed, trim=FORWARD_TRIM):
+        pulsewidths = self._pw.get((action, speed)) if trim == FORWARD_TRIM else None
+        if pulsewidths is None:
+            # Custom trim or a speed outside the table
+            pulsewidths = to_pulsewidths(*motor_targets(action, speed, trim))
+        self._apply(pulsewidths)
+
+    def set_motors(self, left_us, right_us):
+        self._apply(to_pulsewidths(left_us, right_us))
+
+    def stop(self):
+        self._apply(self._stop_pw)
+
+    def turn_left(self, speed=DEFAULT_SPEED):
+        self._move("left", speed)
+
+    def turn_right(self, speed=DEFAULT_SPEED):
+        self._move("right", speed)
+
+    def forward(self, speed=DEFAULT_SPEED, trim=FORWARD_TRIM):
+        self._move("forward", speed, trim)
+
+    def reverse(self, speed=DEFAULT_SPEED, trim=FORWARD_TRIM):
+        self._move("reverse", speed, trim)
+
+    def drive(self, steer=0.0, speed=DEFAULT_SPEED):
+        """Drive forward with steering.
+        steer: -1.0 (full left) to 1.0 (full right), 0.0 = straight.
+        Reduces inner motor speed to curve; outer stays at full speed.
+        """
+        left_speed = speed
+        right_speed = speed
+        if steer < 0:
+            # Curve left: slow down left motor
+            left_speed = speed * (1.0 + steer)  # steer is negative, so this reduces
+        elif steer > 0:
+            # Curve right: slow down right motor
+            right_speed = speed * (1.0 - steer)
+        self.set_motors(NEUTRAL + left_speed - FORWARD_TRIM, NEUTRAL + right_speed + FORWARD_TRIM)
+
+    def run_for(self, duration, start, *args):
+        """Run a motion for duration seconds, then stop.
+
+        The deadline is taken before the start command is sent, so its
+        round-trip counts toward the duration instead of being added to it.
+        """
+        deadline = time.monotonic() + duration
+        start(*args)
+        sleep_until(deadline)
+        self.stop()
+
+    def forward_cm(self, cm):
+        self.run_for(cm / FORWARD_CM_PER_SEC, self.forward)
+
+    def reverse_cm(self, cm):
+        self.run_for(cm / FORWARD_CM_PER_SEC, self.reverse)
+
+    def _turn_plan(self, degrees):
+        plan = self._turns.get(degrees)
+        if plan is None:
+            if degrees > 0:
+                if DEGREES_PER_SEC_RIGHT is None:
+                    raise RuntimeError("DEGREES_PER_SEC_RIGHT not calibrated yet. Run turn calibration first.")
+                plan = (degrees / DEGREES_PER_SEC_RIGHT, self.turn_right)
+            else:
+                if DEGREES_PER_SEC_LEFT is None:
+                    raise RuntimeError("DEGREES_PER_SEC_LEFT not calibrated yet. Run turn calibration first.")
+                plan = (-degrees / DEGREES_PER_SEC_LEFT, self.turn_left)
+            self._turns[degrees] = plan
+        return plan
+
+    def turn_degrees(self, degrees):
+        self.run_for(*self._turn_plan(degrees))
+
+    def cleanup(self):
+        if self._cleaned:
+            return
+        self._cleaned = True
+        try:
+            self.stop()
+            # Only wait out whatever is left of the hold (none if stopped a while ago).
+            # None if neutral was never written (e.g. the write above failed)
+            if self._stopped_at is not None:
+                sleep_until(self._stopped_at + NEUTRAL_HOLD)
+            self._set_servo(LEFT_MOTOR, 0)
+            self._set_servo(RIGHT_MOTOR, 0)
+            self._last = None
+        finally:
+            # Always release the GPIO handle, even if stopping the motors failed
+            if self.chip is not None:
+                lgpio.gpiochip_close(self.chip)
+            else:
+                if self._script is not None:
+                    self.pi.delete_script(self._script)
+                self.pi.stop()
@@ -2,41 +2,12 @@
 """
 Simple MJPEG streaming server for Raspberry Pi Camera.
 View the stream at http://<pi-ip>:8080 in any browser.
+Needs mjpeglib.py alongside it.
 """
 
-from flask import Flask, Response
-from picamera2 import Picamera2
-import io
+from mjpeglib import StreamingOutput, create_app, run, start_camera
 
-app = Flask(__name__)
-camera = None
-
-
-def init_camera():
-    global camera
-    camera = Picamera2()
-    # Lower resolution for Pi Zero W performance
-    config = camera.create_video_configuration(
-        main={"size": (640, 480), "format": "RGB888"}
-    )
-    camera.configure(config)
-    camera.start()
-
-
-def generate_frames():
-    """Generator that yields MJPEG frames."""
-    while True:
-        stream = io.BytesIO()
-        camera.capture_file(stream, format='jpeg')
-        stream.seek(0)
-        frame = stream.read()
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-
-
-@app.route('/')
-def index():
-    return '''
+INDEX_HTML = '''
     <html>
     <head>
         <title>Pi Camera Stream</title>
@@ -58,17 +29,19 @@ def index():
     </html>
     '''
 
+output = StreamingOutput()
+app = create_app(output, INDEX_HTML)
+camera = None
+
 
-@app.route('/stream')
-def stream():
-    return Response(
-        generate_frames(),
-        mimetype='multipart/x-mixed-replace; boundary=frame'
-    )
+def init_camera():
+    global camera
+    # Lower resolution for Pi Zero W performance
+    camera = start_camera(output, {"size": (640, 480)})
 
 
 if __name__ == '__main__':
     print("Initializing camera...")
     init_camera()
     print("Starting stream at http://0.0.0.0:8080")
-    app.run(host='0.0.0.0', port=8080, threaded=True)
+    run(app)
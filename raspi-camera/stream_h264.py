@@ -4,14 +4,48 @@ Hardware-accelerated H264 streaming with multi-client support.
 Single rpicam-vid process shared across all connected clients.
 
 Uses Pi's GPU encoder - expect 25-30 fps on Pi Zero W.
+
+The stream is served as HTTP at http://<pi-ip>:8080/stream and as raw H264
+(no HTTP framing) at tcp://<pi-ip>:8081.
+
+With --direct, rpicam-vid serves the stream itself on tcp://<pi-ip>:8081
+and Flask only serves the info page (one viewer at a time, near-zero CPU).
+
+With --picamera2, the same hardware encoder is driven in-process through
+Picamera2 instead of reading a rpicam-vid subprocess through a pipe.
 """
 
+import argparse
+import os
+import re
+import shutil
 import subprocess
+import select
 import signal
+import socket
+import socketserver
 import sys
-from flask import Flask, Response
-from threading import Thread, Lock
 import time
+import fcntl
+import io
+from collections import deque
+from itertools import islice
+from flask import Flask, Response
+from threading import Thread, Condition
+
+# Optional: production WSGI server (pip install waitress)
+try:
+    from waitress import serve
+except ImportError:
+    serve = None
+
+# Optional: in-process encoding for --picamera2
+try:
+    from picamera2 import Picamera2
+    from picamera2.encoders import H264Encoder
+    from picamera2.outputs import FileOutput
+except ImportError:
+    Picamera2 = None
 
 app = Flask(__name__)
 
@@ -20,106 +54,337 @@ WIDTH = 640
 HEIGHT = 480
 FPS = 30
 BITRATE = 2000000  # 2 Mbps
+# Main profile (CABAC) needs fewer bits than baseline for the same quality;
+# H264_PROFILE=baseline for players that can't decode it
+PROFILE = os.environ.get('H264_PROFILE', 'main')
+LEVEL = '4'  # Level 4.0 (rpicam-vid only accepts "4", "4.1" or "4.2"); plenty for 640x480@30
+INTRA = 2 * FPS  # Keyframe every 2 s; new clients start at the next one
+PIPE_SIZE = 1 << 20  # 1 MiB rpicam-vid stdout pipe, so encoder output never blocks on us
+READ_SIZE = 65536  # Max bytes per read; a read returns whatever is already in the pipe
+START_CODE = b'\x00\x00\x00\x01'  # Precedes every H264 NAL unit rpicam-vid writes
+SPS_START = re.compile(re.escape(START_CODE) + b'[\x07\x27\x47\x67]')  # NAL type 7 (SPS): starts a keyframe
+BUFFER_BYTES = 1 << 20  # Recent stream kept for clients, ~4 s at 2 Mbps (must cover a keyframe interval)
+TCP_PORT = 8081  # Raw H264 over TCP (served by rpicam-vid itself in --direct mode)
+MIN_RUN = 1.0  # rpicam-vid exiting sooner than this (s) counts as a failed start
+MAX_BACKOFF = 30.0  # Longest wait (s) between failed starts
+SEND_BUFFER = 256 * 1024  # Kernel send buffer per TCP client, ~1 s of stream
+SENDMSG_MAX = 512  # Buffers per sendmsg call (kernel limit IOV_MAX is 1024)
+# waitress worker threads. Each HTTP viewer holds one for as long as it watches, so
+# this many viewers leave none free for other requests; watch extra viewers via TCP
+HTTP_THREADS = int(os.environ.get('STREAM_THREADS', '8'))
+
+RPICAM_CMD = [
+    'rpicam-vid',
+    '-t', '0',                    # Run indefinitely
+    '--nopreview',                # No preview window to render
+    '--codec', 'h264',
+    '--width', str(WIDTH),
+    '--height', str(HEIGHT),
+    '--framerate', str(FPS),
+    '--bitrate', str(BITRATE),
+    '--profile', PROFILE,
+    '--level', LEVEL,
+    '--intra', str(INTRA),
+    '--inline',                   # Include headers in stream
+    '--flush',                    # Push each frame out as soon as it's encoded
+]
+
+INDEX_HTML = f'''
+<html>
+<head><title>Pi H264 Stream</title></head>
+<body style="margin:0;background:#000;color:#fff;padding:20px">
+    <h1>H264 Stream (Multi-Client)</h1>
+    <p>Stream running at /stream and as raw H264 on tcp port {TCP_PORT}</p>
+    <p>Supports multiple simultaneous viewers</p>
+    <p>View with:</p>
+    <ul>
+        <li>VLC: vlc http://&lt;pi-ip&gt;:8080/stream</li>
+        <li>ffplay: ffplay tcp://&lt;pi-ip&gt;:{TCP_PORT}</li>
+        <li>OpenCV: python3 local_cv_h264.py</li>
+    </ul>
+</body>
+</html>
+'''.encode()
+
+DIRECT_INDEX_HTML = f'''
+<html>
+<head><title>Pi H264 Stream</title></head>
+<body style="margin:0;background:#000;color:#fff;padding:20px">
+    <h1>H264 Stream (Direct)</h1>
+    <p>rpicam-vid is serving the stream on port {TCP_PORT}</p>
+    <p>One viewer at a time</p>
+    <p>View with:</p>
+    <ul>
+        <li>VLC: vlc tcp/h264://&lt;pi-ip&gt;:{TCP_PORT}</li>
+        <li>ffplay: ffplay tcp://&lt;pi-ip&gt;:{TCP_PORT}</li>
+    </ul>
+</body>
+</html>
+'''.encode()
 
 # Shared stream state
 running = True
+direct = False
 rpicam_process = None
+camera = None
 stream_thread = None
 
 
 class StreamBuffer:
-    """Thread-safe buffer for sharing stream data across clients."""
+    """Fans the encoder output out to every connected client.
 
-    def __init__(self, maxsize=30):
-        self.buffer = []
-        self.maxsize = maxsize
-        self.lock = Lock()
+    One shared ring of recent chunks, bounded in bytes; each client keeps
+    its own cursor (a chunk count) into it, so every viewer receives the
+    whole stream and a slow viewer only skips ahead itself. The producer
+    appends once per chunk no matter how many clients are connected.
+
+    New clients, and clients that fall behind the ring, start at the next
+    keyframe (a chunk beginning with an SPS) so they never get undecodable
+    P-frames.
+    """
+
+    def __init__(self, capacity=BUFFER_BYTES):
+        self.chunks = deque()
+        self.size = 0  # Bytes currently held
+        self.capacity = capacity
+        self.head = 0  # Total chunks ever put; cursor of the next chunk
+        self.keyframes = deque()  # Cursors of held chunks that start with an SPS
+        self.closed = False
+        self.cond = Condition()
 
     def put(self, chunk):
-        with self.lock:
-            self.buffer.append(chunk)
-            if len(self.buffer) > self.maxsize:
-                self.buffer.pop(0)
+        with self.cond:
+            if SPS_START.match(chunk):
+                self.keyframes.append(self.head)
+            self.chunks.append(chunk)
+            self.size += len(chunk)
+            self.head += 1
+            # Drop the oldest chunks once over capacity (always keep the newest)
+            while self.size > self.capacity and len(self.chunks) > 1:
+                self.size -= len(self.chunks.popleft())
+            oldest = self.head - len(self.chunks)
+            while self.keyframes and self.keyframes[0] < oldest:
+                self.keyframes.popleft()
+            self.cond.notify_all()
+
+    def close(self):
+        """End the stream, waking every waiting client."""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
 
-    def get_all(self):
-        with self.lock:
-            data = b''.join(self.buffer)
-            self.buffer = []
-            return data
+    def read(self, cursor, synced, timeout=1.0):
+        """Chunks after cursor, waiting up to timeout for some.
+
+        An unsynced client gets nothing until a keyframe at or after its
+        cursor arrives. Returns (cursor, synced, chunks).
+        """
+        with self.cond:
+            # Sleep until put()/close() notify; no polling
+            self.cond.wait_for(lambda: self.head != cursor or self.closed, timeout)
+            oldest = self.head - len(self.chunks)
+            if cursor < oldest:
+                cursor, synced = oldest, False  # Fell behind the ring; what it missed is gone
+            if not synced:
+                keyframe = next((k for k in self.keyframes if k >= cursor), None)
+                if keyframe is None:
+                    return self.head, False, []
+                cursor, synced = keyframe, True
+            chunks = list(islice(self.chunks, cursor - oldest, None))
+            return self.head, True, chunks
+
+    def follow(self):
+        """Yield lists of chunks for one client until the stream ends, starting at the next keyframe."""
+        cursor, synced = self.head, False
+        while not self.closed:
+            cursor, synced, chunks = self.read(cursor, synced)
+            yield chunks
 
 
 # Global buffer for sharing stream
 stream_buffer = StreamBuffer()
 
 
+def encoder_cpus():
+    """Cores to pin rpicam-vid to, or None on a single-core Pi (Zero W)."""
+    cpus = sorted(os.sched_getaffinity(0))
+    if len(cpus) < 4 or shutil.which('taskset') is None:
+        return None
+    # Leave the first core to Flask and the last to the motor loop (see motorlib)
+    return cpus[1:-1]
+
+
+def rpicam_cmd(output):
+    """rpicam-vid command line writing the H264 stream to output."""
+    cpus = encoder_cpus()
+    pin = ['taskset', '-c', ','.join(map(str, cpus))] if cpus else []
+    return [*pin, *RPICAM_CMD, *output]
+
+
+def publish(data):
+    """Put whole NAL units into the buffer, starting a new chunk at each SPS so keyframes begin a chunk."""
+    start = 0
+    for m in SPS_START.finditer(data, 1):
+        stream_buffer.put(data[start:m.start()])
+        start = m.start()
+    stream_buffer.put(data[start:])
+
+
 def stream_reader():
     """Background thread that reads from rpicam-vid."""
     global rpicam_process, running
 
-    cmd = [
-        'rpicam-vid',
-        '-t', '0',                    # Run indefinitely
-        '--width', str(WIDTH),
-        '--height', str(HEIGHT),
-        '--framerate', str(FPS),
-        '--bitrate', str(BITRATE),
-        '--profile', 'baseline',      # Better compatibility
-        '--level', '4.2',
-        '--inline',                   # Include headers in stream
-        '-o', '-'                     # Output to stdout
-    ]
-
     rpicam_process = subprocess.Popen(
-        cmd,
+        rpicam_cmd(['-o', '-']),      # Output to stdout
         stdout=subprocess.PIPE,
         stderr=subprocess.DEVNULL,
         bufsize=0
     )
 
+    # Enlarge the pipe (default 64 KiB) so a slow read never stalls the encoder
+    try:
+        fcntl.fcntl(rpicam_process.stdout, getattr(fcntl, 'F_SETPIPE_SZ', 1031), PIPE_SIZE)
+    except OSError as e:
+        print(f"Could not resize stdout pipe: {e}")
+
+    # Read the raw fd: one syscall per read, returning as soon as any data is there
+    fd = rpicam_process.stdout.fileno()
+    pending = bytearray()
     while running:
-        chunk = rpicam_process.stdout.read(4096)
+        chunk = os.read(fd, READ_SIZE)
         if not chunk:
             break
-        stream_buffer.put(chunk)
+        # rpicam-vid --flush writes a whole frame at a time, so an empty pipe
+        # means everything read so far ends on a NAL boundary
+        drained = not select.select([fd], [], [], 0)[0]
+        if drained and not pending:
+            publish(chunk)  # Usual case: one read = one frame, published without copying
+            continue
+
+        pending += chunk
+        if drained:
+            publish(bytes(pending))
+            pending.clear()
+            continue
+
+        # More is already waiting: publish whole NALs, keep the unfinished last one
+        end = pending.rfind(START_CODE)
+        if end > 0:
+            with memoryview(pending) as view:
+                publish(bytes(view[:end]))
+            del pending[:end]
 
+    if pending:
+        publish(bytes(pending))
+
+    stream_buffer.close()  # Encoder gone: end client streams instead of leaving them hanging
     rpicam_process.terminate()
     rpicam_process.wait()
 
 
-def generate_h264():
-    """Yield H264 chunks to client."""
+class EncoderOutput(io.BufferedIOBase):
+    """Picamera2 output that publishes each encoded frame to the stream buffer."""
+
+    def write(self, buf):
+        publish(bytes(buf))
+
+
+def start_picamera2():
+    """Encode in-process with Picamera2's H264Encoder (no rpicam-vid, no pipe)."""
+    global camera
+    camera = Picamera2()
+    camera.configure(camera.create_video_configuration(
+        main={"size": (WIDTH, HEIGHT)},
+        controls={"FrameRate": FPS}
+    ))
+    # repeat=True puts SPS/PPS before every keyframe, like rpicam-vid --inline
+    encoder = H264Encoder(bitrate=BITRATE, repeat=True, iperiod=INTRA, profile=PROFILE)
+    camera.start_recording(encoder, FileOutput(EncoderOutput()))
+
+
+def direct_server():
+    """Background thread that keeps rpicam-vid listening on its TCP port.
+
+    rpicam-vid exits when its client disconnects, so restart it for the next.
+    If it fails straight away (camera busy, port in use), back off between
+    attempts instead of respawning it in a tight loop.
+    """
+    global rpicam_process
+
+    # --verbose 0 drops the per-frame status lines but still prints errors
+    cmd = rpicam_cmd(['--verbose', '0', '--listen', '-o', f'tcp://0.0.0.0:{TCP_PORT}'])
+    backoff = 1.0
     while running:
-        data = stream_buffer.get_all()
-        if data:
-            yield data
+        started = time.monotonic()
+        rpicam_process = subprocess.Popen(cmd)
+        code = rpicam_process.wait()
+        if not running:
+            break
+        if time.monotonic() - started < MIN_RUN:
+            print(f"rpicam-vid exited with code {code} right after starting, retrying in {backoff:.0f}s")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF)
         else:
-            time.sleep(0.01)
+            print(f"rpicam-vid exited with code {code}, restarting for the next client")
+            backoff = 1.0
+
+
+def generate_h264():
+    """Yield H264 chunks to client."""
+    for chunks in stream_buffer.follow():
+        # Hand the encoder's chunks over as-is rather than joining them into a new copy
+        yield from chunks
+
+
+def send_chunks(sock, chunks):
+    """Send all chunks with scatter-gather sendmsg: one syscall per batch, no joining."""
+    for i in range(0, len(chunks), SENDMSG_MAX):
+        views = [memoryview(chunk) for chunk in chunks[i:i + SENDMSG_MAX]]
+        first = 0
+        while first < len(views):
+            sent = sock.sendmsg(views[first:])
+            # Skip what went out; a partly sent buffer resumes where it stopped
+            while first < len(views) and sent >= len(views[first]):
+                sent -= len(views[first])
+                first += 1
+            if sent:
+                views[first] = views[first][sent:]
+
+
+class H264TCPHandler(socketserver.BaseRequestHandler):
+    """Sends the raw H264 stream to a TCP client, with no HTTP framing."""
+
+    def handle(self):
+        sock = self.request
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER)
+        try:
+            for chunks in stream_buffer.follow():
+                send_chunks(sock, chunks)
+        except OSError:
+            pass  # Client disconnected
+
+
+class H264TCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
 
 
 @app.route('/')
 def index():
-    return '''
-    <html>
-    <head><title>Pi H264 Stream</title></head>
-    <body style="margin:0;background:#000;color:#fff;padding:20px">
-        <h1>H264 Stream (Multi-Client)</h1>
-        <p>Stream running at /stream</p>
-        <p>Supports multiple simultaneous viewers</p>
-        <p>View with:</p>
-        <ul>
-            <li>VLC: vlc http://&lt;pi-ip&gt;:8080/stream</li>
-            <li>OpenCV: python3 local_cv_h264.py</li>
-        </ul>
-    </body>
-    </html>
-    '''
+    return DIRECT_INDEX_HTML if direct else INDEX_HTML
 
 
 @app.route('/stream')
 def stream():
+    if direct:
+        return f'Stream is served by rpicam-vid on port {TCP_PORT}\n', 404
+    # direct_passthrough hands the generator straight to the server, skipping
+    # Werkzeug's per-chunk re-encoding wrapper (chunks are already bytes)
     return Response(
         generate_h264(),
-        mimetype='video/h264'
+        mimetype='video/h264',
+        direct_passthrough=True
     )
 
 
@@ -127,23 +392,56 @@ def cleanup(sig, frame):
     global running, rpicam_process
     print("\nShutting down...")
     running = False
+    stream_buffer.close()
     if rpicam_process:
         rpicam_process.terminate()
         rpicam_process.wait()
+    if camera:
+        camera.stop_recording()
     sys.exit(0)
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="H264 streaming server")
+    parser.add_argument('--direct', action='store_true',
+                        help=f"Let rpicam-vid serve the stream on tcp port {TCP_PORT} "
+                             "(single viewer, bypasses Python)")
+    parser.add_argument('--picamera2', action='store_true',
+                        help="Encode in-process with Picamera2 instead of a rpicam-vid subprocess")
+    args = parser.parse_args()
+    if args.direct and args.picamera2:
+        parser.error("--direct runs rpicam-vid itself; it can't be combined with --picamera2")
+    direct = args.direct
+    if args.picamera2 and Picamera2 is None:
+        print("--picamera2 needs the picamera2 package (sudo apt install python3-picamera2)")
+        sys.exit(1)
+
     signal.signal(signal.SIGINT, cleanup)
     signal.signal(signal.SIGTERM, cleanup)
 
-    # Start stream reader in background
-    stream_thread = Thread(target=stream_reader, daemon=True)
-    stream_thread.start()
+    if args.picamera2:
+        start_picamera2()
+    else:
+        # Start stream reader (or direct rpicam-vid server) in background
+        stream_thread = Thread(target=direct_server if direct else stream_reader, daemon=True)
+        stream_thread.start()
+
+    if not direct:
+        tcp_server = H264TCPServer(('0.0.0.0', TCP_PORT), H264TCPHandler)
+        Thread(target=tcp_server.serve_forever, daemon=True).start()
 
-    print(f"Starting H264 stream at http://0.0.0.0:8080 (multi-client)")
+    if direct:
+        print(f"Starting H264 stream at tcp://0.0.0.0:{TCP_PORT} (direct, single client)")
+        print(f"Info page at http://0.0.0.0:8080")
+    else:
+        print(f"Starting H264 stream at http://0.0.0.0:8080 (multi-client)")
+        print(f"Raw H264 at tcp://0.0.0.0:{TCP_PORT}")
     print(f"Resolution: {WIDTH}x{HEIGHT} @ {FPS}fps")
     print(f"Bitrate: {BITRATE//1000}kbps")
     print()
 
-    app.run(host='0.0.0.0', port=8080, threaded=True)
+    if serve is not None:
+        print(f"Serving at most {HTTP_THREADS} HTTP viewers (STREAM_THREADS); TCP has no limit")
+        serve(app, host='0.0.0.0', port=8080, threads=HTTP_THREADS)
+    else:
+        app.run(host='0.0.0.0', port=8080, threaded=True)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Checks that local_hands.draw_cached_text matches cv2.putText pixel for pixel
+(to within 1 per channel: putText rounds its anti-aliasing coverage differently).
+
+Run: python3 -m unittest test_text_cache   (or pytest test_text_cache.py)
+"""
+
+import unittest
+
+import cv2
+import numpy as np
+
+try:
+    import local_hands
+except ImportError:  # local_hands needs mediapipe
+    local_hands = None
+
+
+@unittest.skipIf(local_hands is None, "mediapipe not installed")
+class DrawCachedTextTest(unittest.TestCase):
+
+    def assert_matches_puttext(self, text, org, scale, color, thickness, size=(120, 320)):
+        rng = np.random.default_rng(0)
+        background = rng.integers(0, 256, (*size, 3), dtype=np.uint8)
+        expected = background.copy()
+        cv2.putText(expected, text, org, cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness)
+        actual = local_hands.draw_cached_text(background.copy(), text, org, scale, color, thickness)
+        diff = np.abs(actual.astype(int) - expected)
+        self.assertLessEqual(diff.max(), 1, f"{text!r}: off by up to {diff.max()}")
+
+    def test_cached_render_covers_whole_stroke(self):
+        # Nothing putText draws, including faint anti-aliased edges, falls outside the pad
+        for thickness in (1, 2, 3):
+            alpha, ascent, pad = local_hands._text_alpha("Wgjy|", 1.0, thickness)
+            canvas = np.zeros((200, 400), dtype=np.uint8)
+            cv2.putText(canvas, "Wgjy|", (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 1.0, 255, thickness)
+            self.assertEqual(int(alpha.sum()), int(canvas.sum()))
+
+    def test_gesture_labels(self):
+        # As drawn on the frame and in the side panel
+        for text in ("FIST", "OPEN_PALM", "THUMBS_UP", "POINTING", "PEACE", "CALL_ME", "NONE"):
+            self.assert_matches_puttext(text, (20, 50), 1.0, (0, 255, 255), 2)
+            self.assert_matches_puttext(text, (10, 80), 0.9, (200, 60, 10), 2)
+
+    def test_scales_and_thickness(self):
+        for scale in (0.4, 0.7, 1.5):
+            for thickness in (1, 2, 3):
+                self.assert_matches_puttext("Wgjy|", (15, 70), scale, (90, 180, 30), thickness)
+
+    def test_clipped_at_edges(self):
+        for org in ((-10, 20), (250, 115), (5, 5), (300, 60)):
+            self.assert_matches_puttext("FIST", org, 1.0, (0, 0, 0), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
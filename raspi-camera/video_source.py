@@ -7,11 +7,17 @@ Usage:
 
     args = parse_args()
     cap = get_capture(args)
+    ret, frame = read_latest(cap)  # or cap.read()
     # ... in reconnect logic:
     cap = reconnect(args, cap)
 """
 
 import argparse
+import os
+import re
+import sys
+import threading
+import time
 import cv2
 
 # Defaults
@@ -19,6 +25,34 @@ DEFAULT_PI_HOST = "192.168.4.80"
 DEFAULT_PORT = 8080
 DEFAULT_STREAM_PATH = "/stream"
 
+# Frame draining: a grab() that returns faster than this was already buffered
+STALE_GRAB_SECONDS = 0.005
+MAX_DRAIN_FRAMES = 10
+
+# Open ThreadedCaptures shared within the process, keyed by (source, target_fps);
+# opening a remote stream re-probes it, which takes seconds
+_CAPTURES = {}
+_CAPTURES_LOCK = threading.Lock()
+
+# FFmpeg input options for remote streams (CAP_PROP_BUFFERSIZE doesn't reach FFmpeg's
+# own buffering). Probing stops as soon as the stream's SPS is seen; the limits just
+# cover waiting up to ~1 s for the next one when joining mid-stream.
+FFMPEG_CAPTURE_OPTIONS = "|".join([
+    "fflags;nobuffer",
+    "flags;low_delay",
+    "probesize;262144",
+    "analyzeduration;1000000",
+    "max_delay;0",
+    "reconnect;1",
+    "reconnect_streamed;1",
+])
+
+# Linux webcam via GStreamer: JPEG decoded in the pipeline, at most one frame queued
+GSTREAMER_WEBCAM = (
+    "v4l2src device=/dev/video0 ! image/jpeg,width=640,height=480,framerate=30/1 ! "
+    "jpegdec ! videoconvert ! appsink max-buffers=1 drop=true sync=false"
+)
+
 
 def create_parser(description="CV app"):
     """Create an argument parser with video source options.
@@ -43,6 +77,12 @@ def create_parser(description="CV app"):
         default=DEFAULT_PORT,
         help=f'Stream port for remote sources (default: {DEFAULT_PORT})'
     )
+    parser.add_argument(
+        '--target-fps',
+        type=float,
+        default=0,
+        help='Process at most this many frames per second; skipped frames are grabbed but not retrieved/converted (default: all)'
+    )
 
     return parser
 
@@ -80,28 +120,208 @@ def get_source_url(args):
     return f"http://{host}:{args.port}{DEFAULT_STREAM_PATH}"
 
 
-def get_capture(args):
-    """Create and configure a VideoCapture for the given source."""
+class ThreadedCapture:
+    """Wraps a VideoCapture and reads it on a background thread.
+
+    The next frame is decoded while the caller processes the current one.
+    Only the newest frame is kept; older ones are dropped.
+
+    get_capture shares one ThreadedCapture per source between threads: each
+    reading thread gets every newest frame (the same array, so copy it before
+    drawing on it), and the capture closes when its last user releases it.
+    """
+
+    def __init__(self, cap):
+        self.cap = cap
+        self._latest = (False, None)
+        self._seq = 0  # Frames read so far
+        self._seen = threading.local()  # Per reading thread: _seq of the last frame returned
+        self._cond = threading.Condition()
+        self._users = 1  # Guarded by _CAPTURES_LOCK
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._reader, daemon=True)
+        self._thread.start()
+
+    def _reader(self):
+        while not self._stopped.is_set():
+            ret, frame = self.cap.read()
+            # Replace any frame the consumers haven't picked up yet
+            with self._cond:
+                self._latest = (ret, frame)
+                self._seq += 1
+                self._cond.notify_all()
+            if not ret:
+                break
+        if self._stopped.is_set():
+            self.cap.release()
+
+    def read(self, timeout=5.0):
+        """Return (ret, frame) for the newest frame, waiting for one if needed."""
+        seen = getattr(self._seen, 'seq', 0)
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq != seen, timeout):
+                return False, None
+            self._seen.seq = self._seq
+            return self._latest
+
+    def isOpened(self):
+        return not self._stopped.is_set() and self.cap.isOpened()
+
+    def release(self):
+        """Drop this user; the last one stops the reader thread and releases the capture."""
+        with _CAPTURES_LOCK:
+            self._users -= 1
+            if self._users > 0:
+                return
+            for key, shared in list(_CAPTURES.items()):
+                if shared is self:
+                    del _CAPTURES[key]
+        self._stopped.set()
+        self._thread.join(timeout=1.0)
+        if not self._thread.is_alive():
+            self.cap.release()
+        # Otherwise the reader releases it once its blocking read() returns
+
+
+class DecimatedCapture:
+    """Wraps a VideoCapture so read() returns at most target_fps frames per second.
+
+    Frames arriving between due times are only grab()bed: FFmpeg still decodes
+    them (an H264 stream can't skip frames), but they aren't retrieved or
+    converted to BGR.
+    """
+
+    def __init__(self, cap, target_fps):
+        self.cap = cap
+        self.interval = 1.0 / target_fps
+        self._next = 0.0  # time.monotonic() when the next frame is due
+
+    def _take_due(self):
+        """True (and schedule the next) if a frame is due to be retrieved now."""
+        now = time.monotonic()
+        if now < self._next:
+            return False
+        # Keep a steady cadence, but restart it after a stall rather than catching up
+        if now - self._next >= self.interval:
+            self._next = now
+        self._next += self.interval
+        return True
+
+    def read(self):
+        while True:
+            if not self.cap.grab():
+                return False, None
+            if self._take_due():
+                return self.cap.retrieve()
+
+    def grab(self):
+        return self.cap.grab()
+
+    def retrieve(self):
+        return self.cap.retrieve()
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+
+def has_gstreamer():
+    """True on Linux when this OpenCV build was compiled with GStreamer."""
+    if not sys.platform.startswith('linux'):
+        return False
+    return re.search(r'GStreamer:\s*YES', cv2.getBuildInformation()) is not None
+
+
+def get_capture(args, threaded=False):
+    """Create and configure a VideoCapture for the given source.
+
+    With threaded=True, frames are read on a background thread (see ThreadedCapture);
+    a threaded capture already open for the source in this process is shared, and
+    each user releases it independently.
+    With --target-fps, reads are decimated to that rate (see DecimatedCapture).
+    """
     source = get_source_url(args)
+    target_fps = getattr(args, 'target_fps', 0)
+    if not threaded:
+        return _open_capture(source, False, target_fps)
+
+    key = (source, target_fps)
+    with _CAPTURES_LOCK:
+        cap = _CAPTURES.get(key)
+        if cap is not None and cap.isOpened():
+            cap._users += 1
+        else:
+            # Opened under the lock so concurrent callers don't probe the stream twice
+            cap = _open_capture(source, True, target_fps)
+            _CAPTURES[key] = cap
+        return cap
+
 
+def _open_capture(source, threaded, target_fps):
+    """Create and configure a new VideoCapture (see get_capture)."""
     if source == 0:
         # Local webcam
-        cap = cv2.VideoCapture(0)
+        cap = None
+        if has_gstreamer():
+            cap = cv2.VideoCapture(GSTREAMER_WEBCAM, cv2.CAP_GSTREAMER)
+            if not cap.isOpened():
+                cap = None  # e.g. camera without MJPEG output
+        if cap is None:
+            cap = cv2.VideoCapture(0)
         print(f"Using local webcam")
     else:
-        # Remote stream (H264)
+        # Remote stream (H264). OpenCV reads the options when the capture opens;
+        # a value already set in the environment wins
+        os.environ.setdefault("OPENCV_FFMPEG_CAPTURE_OPTIONS", FFMPEG_CAPTURE_OPTIONS)
         cap = cv2.VideoCapture(source, cv2.CAP_FFMPEG)
-        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
         print(f"Connecting to {source}")
 
+    # Keep at most one queued frame (ignored by backends that don't support it)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+    if target_fps:
+        cap = DecimatedCapture(cap, target_fps)
+
+    if threaded:
+        cap = ThreadedCapture(cap)
+
     return cap
 
 
+def read_latest(cap):
+    """Read the newest available frame, skipping any that queued up meanwhile.
+
+    Frames are grabbed until one has to be waited for (i.e. it's fresh), and
+    only that last frame is retrieved, so stale frames skip BGR conversion.
+    With a DecimatedCapture, the fresh frame is only retrieved if one is due;
+    otherwise it keeps grabbing until one is (see DecimatedCapture.read).
+    Returns (ret, frame) like cap.read().
+    """
+    for _ in range(MAX_DRAIN_FRAMES):
+        start = time.perf_counter()
+        if not cap.grab():
+            return False, None
+        if time.perf_counter() - start > STALE_GRAB_SECONDS:
+            break
+    if isinstance(cap, DecimatedCapture) and not cap._take_due():
+        return cap.read()
+    return cap.retrieve()
+
+
 def reconnect(args, cap):
-    """Release existing capture and create a new one."""
+    """Release existing capture and create a new one of the same kind."""
+    threaded = isinstance(cap, ThreadedCapture)
+    if threaded:
+        # Open a fresh one even if other users still hold this (possibly broken) capture
+        with _CAPTURES_LOCK:
+            for key, shared in list(_CAPTURES.items()):
+                if shared is cap:
+                    del _CAPTURES[key]
     if cap is not None:
         cap.release()
-    return get_capture(args)
+    return get_capture(args, threaded=threaded)
 
 
 def is_local(args):